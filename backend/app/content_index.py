@@ -0,0 +1,115 @@
+import os
+from datetime import datetime
+from typing import Callable, Iterator, Optional, Tuple
+from sqlalchemy import or_
+from sqlmodel import Session, delete, select
+from .models import Book, BookContent, ScannedFile
+from .scanners import EPUBScanner, PDFScanner
+
+CONTENT_INDEXING = os.getenv("LOCALREADS_INDEX_CONTENT", "").lower() in ("1", "true", "yes")
+CONTENT_INSERT_BATCH = 200
+
+# Chunk rowids are (book_id << CHUNK_ID_BITS) | chunk number, so replacing or
+# dropping one book's text is a rowid range delete rather than a table scan
+CHUNK_ID_BITS = 20
+MAX_CHUNKS = 1 << CHUNK_ID_BITS
+
+CONTENT_SCANNERS = {"epub": EPUBScanner, "pdf": PDFScanner}
+
+
+def iter_book_text(file_path: str, file_type: str) -> Iterator[Tuple[int, str]]:
+    scanner = CONTENT_SCANNERS.get(file_type)
+    if scanner is None:
+        return iter(())
+    return scanner.iter_text(file_path)
+
+
+def index_book_content(
+    session: Session, book_id: int, file_path: str, file_type: str, size: int, mtime_ns: int
+) -> int:
+    """Replace the indexed text of one book and return its chunk count.
+
+    Text is streamed from the scanner and committed CONTENT_INSERT_BATCH
+    chunks at a time. Extraction runs outside any transaction, so neither
+    memory use nor how long the database stays locked depends on the book's
+    size. The BookContent row marking the book indexed is written last: a run
+    interrupted halfway leaves the book pending, and the next run starts it
+    over.
+    """
+    first_rowid = book_id << CHUNK_ID_BITS
+    session.exec(delete(BookContent).where(BookContent.book_id == book_id))
+    session.connection().exec_driver_sql(
+        "DELETE FROM book_content_fts WHERE rowid BETWEEN ? AND ?",
+        (first_rowid, first_rowid + MAX_CHUNKS - 1),
+    )
+    session.commit()
+
+    insert = "INSERT INTO book_content_fts (rowid, body, page) VALUES (?, ?, ?)"
+    rows = []
+    chunks = 0
+    for page, body in iter_book_text(file_path, file_type):
+        if chunks == MAX_CHUNKS:
+            break
+        rows.append((first_rowid + chunks, body, page))
+        chunks += 1
+        if len(rows) >= CONTENT_INSERT_BATCH:
+            session.connection().exec_driver_sql(insert, rows)
+            session.commit()
+            rows = []
+    if rows:
+        session.connection().exec_driver_sql(insert, rows)
+    session.merge(
+        BookContent(
+            book_id=book_id,
+            size=size,
+            mtime_ns=mtime_ns,
+            chunks=chunks,
+            indexed_at=datetime.now(),
+        )
+    )
+    session.commit()
+    return chunks
+
+
+def index_pending_content(
+    session: Session,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """Index the text of scanned books not indexed since their file last changed.
+
+    A cancelled run keeps the books it finished.
+    """
+    pending = session.exec(
+        select(Book.id, Book.file_path, Book.file_type, ScannedFile.size, ScannedFile.mtime_ns)
+        .join(ScannedFile, ScannedFile.file_path == Book.file_path)
+        .outerjoin(BookContent, BookContent.book_id == Book.id)
+        .where(
+            ScannedFile.missing.is_(False),
+            Book.file_type.in_(CONTENT_SCANNERS),
+            or_(
+                BookContent.book_id.is_(None),
+                BookContent.size != ScannedFile.size,
+                BookContent.mtime_ns != ScannedFile.mtime_ns,
+            ),
+        )
+    ).all()
+    stats = {"pending_books": len(pending), "indexed_books": 0, "indexed_chunks": 0, "errors": 0}
+    status = "success"
+
+    for book_id, file_path, file_type, size, mtime_ns in pending:
+        if should_stop and should_stop():
+            status = "cancelled"
+            break
+        try:
+            chunks = index_book_content(session, book_id, file_path, file_type, size, mtime_ns)
+            stats["indexed_books"] += 1
+            stats["indexed_chunks"] += chunks
+        except Exception as e:
+            session.rollback()
+            print(f"Error indexing content of {file_path}: {e}")
+            stats["errors"] += 1
+        if on_progress:
+            on_progress(dict(stats))
+
+    return {"status": status, **stats}
@@ -0,0 +1,252 @@
+import os
+import re
+import sys
+import time
+import hashlib
+from functools import lru_cache
+from typing import Callable, Optional
+from xml.sax.saxutils import escape
+from PIL import Image, features
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+COVERS_DIR = "covers"
+
+# Bounding boxes; covers keep their aspect ratio inside them
+COVER_SIZES = {
+    "grid": (200, 300),
+    "detail": (400, 600),
+    "retina": (800, 1200),
+}
+DEFAULT_COVER_SIZE = "detail"
+
+# cover_path of a PDF whose cover failed to render, so it is not tried again
+# on every request; a rescan of the changed file resets it to NULL
+NO_COVER = ""
+COVER_QUALITY = int(os.getenv("LOCALREADS_COVER_QUALITY", "75"))
+
+# Stored cover files never change once written: their name is their content
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_FORMATS = {
+    "avif": ("AVIF", "avif"),
+    "webp": ("WEBP", "webp"),
+    "jpeg": ("JPEG", "jpg"),
+}
+
+
+def _pick_format():
+    preferred = os.getenv("LOCALREADS_COVER_FORMAT", "webp").lower()
+    for name in (preferred, "webp", "jpeg"):
+        if name not in _FORMATS:
+            continue
+        if name == "jpeg" or features.check(name):
+            return _FORMATS[name]
+    return _FORMATS["jpeg"]
+
+
+COVER_FORMAT, COVER_EXTENSION = _pick_format()
+
+_VARIANT_PATTERN = re.compile(r"^(.*)_(%s)\.(\w+)$" % "|".join(COVER_SIZES))
+
+
+def cover_content_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def stored_cover_path(content_hash: str, size: str = DEFAULT_COVER_SIZE) -> str:
+    """Sharded location of a cover: covers/ab/cd/abcd..._<size>.<ext>"""
+    return os.path.join(
+        COVERS_DIR,
+        content_hash[:2],
+        content_hash[2:4],
+        f"{content_hash}_{size}.{COVER_EXTENSION}",
+    )
+
+
+def cover_variant_path(cover_path: str, size: str) -> str:
+    """Path of the given size of a stored cover.
+
+    Covers saved before the size pipeline existed have a single file, which
+    is returned for every size.
+    """
+    match = _VARIANT_PATTERN.match(cover_path)
+    if not match or size not in COVER_SIZES:
+        return cover_path
+    return f"{match.group(1)}_{size}.{match.group(3)}"
+
+
+def _cover_stem(path: str) -> str:
+    match = _VARIANT_PATTERN.match(path)
+    return match.group(1) if match else path
+
+
+def store_cover(content_hash: str, open_image: Callable[[], Image.Image]) -> str:
+    """Store every cover size for content_hash and return the default size's path.
+
+    Covers are content-addressed, so an image already in the store is not
+    decoded or encoded again and books sharing a cover share its files.
+    ``open_image`` is only called on a miss and should return a freshly
+    opened, not yet loaded image: for JPEG sources Pillow then decodes
+    straight at a reduced scale (``draft``), and each smaller size is derived
+    from the previous one with ``reduce``-assisted resampling. Files are
+    written under a temporary name and renamed, so concurrent scanners
+    storing the same cover never expose a partial file.
+    """
+    paths = {size: stored_cover_path(content_hash, size) for size in COVER_SIZES}
+    if all(os.path.isfile(path) for path in paths.values()):
+        return paths[DEFAULT_COVER_SIZE]
+
+    os.makedirs(os.path.dirname(paths[DEFAULT_COVER_SIZE]), exist_ok=True)
+    image = open_image()
+    image.draft("RGB", max(COVER_SIZES.values()))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    for size, box in sorted(COVER_SIZES.items(), key=lambda s: s[1], reverse=True):
+        image.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        temp_path = f"{paths[size]}.{os.getpid()}.tmp"
+        image.save(temp_path, COVER_FORMAT, quality=COVER_QUALITY)
+        os.replace(temp_path, paths[size])
+    return paths[DEFAULT_COVER_SIZE]
+
+
+def resolve_cover_file(cover_path: Optional[str], size: str) -> Optional[str]:
+    """Local file to serve for a cover at the given size, if any"""
+    if not cover_path or cover_path.startswith(("http://", "https://")):
+        return None
+    path = cover_variant_path(cover_path, size)
+    if os.path.isfile(path):
+        return path
+    if os.path.isfile(cover_path):
+        return cover_path
+    return None
+
+
+def cover_etag(path: str) -> str:
+    return f'"{os.path.splitext(os.path.basename(path))[0]}"'
+
+
+def cover_file_response(path: str, request_headers: Headers, cache_control: str) -> Response:
+    """FileResponse tagged with the cover's content name, or 304 when it matches"""
+    response = FileResponse(path)
+    response.headers["etag"] = cover_etag(path)
+    response.headers["cache-control"] = cache_control
+    if request_headers.get("if-none-match") == response.headers["etag"]:
+        return NotModifiedResponse(response.headers)
+    return response
+
+
+class CoverStaticFiles(StaticFiles):
+    """Serve the cover store with content-derived ETags and immutable caching"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        response.headers["etag"] = cover_etag(str(full_path))
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+PLACEHOLDER_CACHE_SIZE = int(os.getenv("LOCALREADS_PLACEHOLDER_CACHE_SIZE", "1024"))
+
+
+def _wrap_title(title: str, width: int = 20, max_lines: int = 3) -> list:
+    lines = []
+    current_line = ""
+    for word in title.split():
+        test_line = current_line + " " + word if current_line else word
+        if len(test_line) > width and current_line:
+            lines.append(current_line)
+            current_line = word
+        else:
+            current_line = test_line
+    if current_line:
+        lines.append(current_line)
+    return lines[:max_lines]
+
+
+@lru_cache(maxsize=PLACEHOLDER_CACHE_SIZE)
+def placeholder_cover_svg(title: str) -> bytes:
+    """Grey 2:3 cover with the wrapped title, for books without a cover image.
+
+    Rendered on request instead of written to disk at scan time; the most
+    recently used titles stay cached.
+    """
+    width, height = COVER_SIZES["grid"]
+    text = "".join(
+        f'<text x="10" y="{100 + 30 * index}">{escape(line)}</text>'
+        for index, line in enumerate(_wrap_title(title))
+    )
+    svg = (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">'
+        f'<rect width="100%" height="100%" fill="#f0f0f0"/>'
+        f'<g font-family="sans-serif" font-size="16" fill="#000">{text}</g>'
+        f"</svg>"
+    )
+    return svg.encode("utf-8")
+
+
+def placeholder_response(
+    title: str, request_headers: Headers, cache_control: str = IMMUTABLE_CACHE_CONTROL
+) -> Response:
+    """The placeholder for title; its ETag is derived from the title alone"""
+    etag = f'"placeholder-{cover_content_hash(title.encode("utf-8"))}"'
+    headers = {"etag": etag, "cache-control": cache_control}
+    if request_headers.get("if-none-match") == etag:
+        return NotModifiedResponse(headers)
+    return Response(placeholder_cover_svg(title), media_type="image/svg+xml", headers=headers)
+
+
+def collect_garbage(
+    referenced_paths, dry_run: bool = False, grace_seconds: int = 3600
+) -> dict:
+    """Delete cover files not belonging to any referenced cover path.
+
+    Every size of a referenced cover is kept. Files younger than
+    grace_seconds are left alone, so covers written by a running scan whose
+    books are not committed yet survive.
+    """
+    keep = {_cover_stem(os.path.normpath(path)) for path in referenced_paths if path}
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    freed_bytes = 0
+    for directory, _, filenames in os.walk(COVERS_DIR, topdown=False):
+        for filename in filenames:
+            path = os.path.normpath(os.path.join(directory, filename))
+            if _cover_stem(path) in keep:
+                continue
+            file_stat = os.stat(path)
+            if file_stat.st_mtime > cutoff:
+                continue
+            removed += 1
+            freed_bytes += file_stat.st_size
+            if not dry_run:
+                os.remove(path)
+        if not dry_run and directory != COVERS_DIR and not os.listdir(directory):
+            os.rmdir(directory)
+    return {"removed_files": removed, "freed_bytes": freed_bytes, "dry_run": dry_run}
+
+
+def main(argv=None) -> int:
+    """``python -m app.covers gc [--dry-run]``, run from the backend directory"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] != "gc":
+        print("usage: python -m app.covers gc [--dry-run]")
+        return 2
+
+    from sqlmodel import Session, select
+    from .db import engine
+    from .models import Book
+
+    with Session(engine) as session:
+        referenced = session.exec(select(Book.cover_path)).all()
+    print(collect_garbage(referenced, dry_run="--dry-run" in argv))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
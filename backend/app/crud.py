@@ -1,9 +1,20 @@
-from sqlmodel import Session, select
+from sqlalchemy import column, func, literal_column, table
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import selectinload
+from sqlmodel import Session, delete, select, tuple_
 from .models import Book, BookStatus, BookVisibility, Collection, BookCollection
-from typing import List, Optional
-from .scanners import EPUBScanner, PDFScanner
+from typing import Callable, List, Optional, Tuple
+from .scan_engine import ScanEngine, ScanManifest, fingerprint_books, is_book_file
+from .fingerprint import title_key
+from .walker import walk_includes, walk_files
+from .scanners import PDFScanner
+from .content_index import CHUNK_ID_BITS
+from .covers import NO_COVER
 from datetime import datetime
+import base64
+import json
 import os
+import re
 from .utils import fetch_metadata_from_isbn
 
 
@@ -101,12 +112,122 @@ def remove_book_from_collection_db(
         raise
 
 
+# Rows or ids per statement, well under SQLite's bound-variable limit
+LINK_BATCH_SIZE = 500
+
+
+def _chunks(values: list, size: int = LINK_BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def _check_ids_exist(session: Session, model, ids) -> None:
+    """Raise ValueError naming any ids with no row, LINK_BATCH_SIZE ids per query"""
+    ids = set(ids)
+    found = set()
+    for chunk in _chunks(sorted(ids)):
+        found.update(session.exec(select(model.id).where(model.id.in_(chunk))).all())
+    missing = sorted(ids - found)
+    if missing:
+        raise ValueError(
+            f"{model.__name__} not found: {', '.join(str(i) for i in missing)}"
+        )
+
+
+def _insert_links(session: Session, links: List[dict]) -> int:
+    """Insert BookCollection rows LINK_BATCH_SIZE at a time; the caller commits"""
+    added = 0
+    for chunk in _chunks(links):
+        added += session.exec(
+            insert(BookCollection).values(chunk).on_conflict_do_nothing()
+        ).rowcount
+    return added
+
+
+def add_books_to_collections_db(
+    session: Session, book_ids: List[int], collection_ids: List[int]
+) -> int:
+    """Link every book to every collection in one transaction; return new links"""
+    try:
+        _check_ids_exist(session, Book, book_ids)
+        _check_ids_exist(session, Collection, collection_ids)
+        added_at = datetime.now()
+        links = [
+            {"book_id": book_id, "collection_id": collection_id, "added_at": added_at}
+            for collection_id in set(collection_ids)
+            for book_id in set(book_ids)
+        ]
+        if not links:
+            return 0
+        added = _insert_links(session, links)
+        session.commit()
+        return added
+    except Exception as e:
+        session.rollback()
+        print(f"Error adding books to collections: {str(e)}")
+        raise
+
+
+def remove_books_from_collection_db(
+    session: Session, collection_id: int, book_ids: List[int]
+) -> int:
+    try:
+        _check_ids_exist(session, Collection, [collection_id])
+        removed = 0
+        for chunk in _chunks(sorted(set(book_ids))):
+            removed += session.exec(
+                delete(BookCollection)
+                .where(BookCollection.collection_id == collection_id)
+                .where(BookCollection.book_id.in_(chunk))
+            ).rowcount
+        session.commit()
+        return removed
+    except Exception as e:
+        session.rollback()
+        print(f"Error removing books from collection: {str(e)}")
+        raise
+
+
+def replace_collection_books_db(
+    session: Session, collection_id: int, book_ids: List[int]
+) -> dict:
+    """Make book_ids the exact membership of the collection, in one transaction"""
+    try:
+        _check_ids_exist(session, Collection, [collection_id])
+        _check_ids_exist(session, Book, book_ids)
+        current = session.exec(
+            select(BookCollection.book_id).where(BookCollection.collection_id == collection_id)
+        ).all()
+        removed = 0
+        for chunk in _chunks(sorted(set(current) - set(book_ids))):
+            removed += session.exec(
+                delete(BookCollection)
+                .where(BookCollection.collection_id == collection_id)
+                .where(BookCollection.book_id.in_(chunk))
+            ).rowcount
+        added_at = datetime.now()
+        added = _insert_links(
+            session,
+            [
+                {"book_id": book_id, "collection_id": collection_id, "added_at": added_at}
+                for book_id in set(book_ids)
+            ],
+        )
+        session.commit()
+        return {"added": added, "removed": removed}
+    except Exception as e:
+        session.rollback()
+        print(f"Error replacing collection books: {str(e)}")
+        raise
+
+
 def get_collection_with_books_db(session: Session, collection_id: int):
     try:
         books = session.exec(
             select(Book)
             .join(BookCollection, Book.id == BookCollection.book_id)
             .where(BookCollection.collection_id == collection_id)
+            .options(selectinload(Book.collections))
         ).all()
         return books
 
@@ -115,26 +236,296 @@ def get_collection_with_books_db(session: Session, collection_id: int):
         raise
 
 
-def get_books(session: Session, sort_by: str = "title"):
-    statement = select(Book)
-    if sort_by == "title":
-        statement = statement.order_by(Book.title)
-    elif sort_by == "progress":
-        statement = statement.order_by(Book.progress.desc())
+# Sort key -> (column, descending); Book.id breaks ties so keyset cursors are exact
+BOOK_SORTS = {
+    "title": (Book.title, False),
+    "author": (Book.author, False),
+    "progress": (Book.progress, True),
+    "last_updated": (Book.last_updated, True),
+    "created_at": (Book.created_at, True),
+}
+BOOK_FIELDS = set(Book.model_fields)
 
-    books = session.exec(statement).all()
 
-    for book in books:
-        _ = book.collections  # This triggers lazy loading
+def encode_book_cursor(sort_by: str, sort_value, book_id: int) -> str:
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_by, sort_value, book_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
 
+
+def decode_book_cursor(cursor: str, sort_by: str) -> tuple:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, sort_value, book_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if cursor_sort != sort_by:
+        raise ValueError("Cursor does not match sort_by")
+    if sort_by in ("last_updated", "created_at"):
+        sort_value = datetime.fromisoformat(sort_value)
+    return sort_value, book_id
+
+
+def get_books_page(
+    session: Session,
+    sort_by: str = "title",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    visibility: Optional[BookVisibility] = None,
+    status: Optional[BookStatus] = None,
+) -> Tuple[list, Optional[str]]:
+    """One page of books keyset-paginated on (sort column, id), and the next page's cursor"""
+    if sort_by not in BOOK_SORTS:
+        raise ValueError(f"Unsupported sort_by: {sort_by}")
+    sort_column, descending = BOOK_SORTS[sort_by]
+
+    if fields:
+        unknown = set(fields) - BOOK_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        columns = [getattr(Book, field) for field in fields]
+        statement = select(*columns, sort_column.label("_sort"), Book.id.label("_id"))
+    else:
+        statement = select(Book).options(selectinload(Book.collections))
+
+    if visibility:
+        statement = statement.where(Book.visibility == visibility)
+    if status:
+        statement = statement.where(Book.status == status)
+
+    if cursor:
+        sort_value, book_id = decode_book_cursor(cursor, sort_by)
+        key = tuple_(sort_column, Book.id)
+        statement = statement.where(
+            key < (sort_value, book_id) if descending else key > (sort_value, book_id)
+        )
+
+    if descending:
+        statement = statement.order_by(sort_column.desc(), Book.id.desc())
+    else:
+        statement = statement.order_by(sort_column, Book.id)
+    if limit:
+        statement = statement.limit(limit + 1)
+
+    if fields:
+        rows = session.exec(statement).all()
+        keys = [(row._sort, row._id) for row in rows]
+        books = [{field: getattr(row, field) for field in fields} for row in rows]
+    else:
+        books = session.exec(statement).all()
+        keys = [(getattr(book, sort_by), book.id) for book in books]
+
+    next_cursor = None
+    if limit and len(books) > limit:
+        books = books[:limit]
+        next_cursor = encode_book_cursor(sort_by, *keys[limit - 1])
+    return books, next_cursor
+
+
+def get_books(session: Session, sort_by: str = "title"):
+    # Collections arrive eagerly through one selectin query for the whole page
+    books, _ = get_books_page(session, sort_by)
     return books
 
 
 def get_book_by_id(session: Session, book_id: int) -> Optional[Book]:
-    book = session.get(Book, book_id)
-    if book:
-        _ = book.collections  # Load collections
-    return book
+    return session.exec(
+        select(Book).where(Book.id == book_id).options(selectinload(Book.collections))
+    ).first()
+
+
+DUPLICATE_FIELDS = ("id", "title", "author", "file_path", "file_type", "visibility")
+
+
+def get_duplicate_books(session: Session) -> dict:
+    """Groups of books sharing a file content hash or a title/author key"""
+    report = {}
+    for name, column in (("same_content", Book.content_hash), ("same_title", Book.title_key)):
+        shared = (
+            select(column).where(column.is_not(None)).group_by(column).having(func.count() > 1)
+        )
+        groups = {}
+        for book in session.exec(
+            select(Book).where(column.in_(shared)).order_by(column, Book.id)
+        ).all():
+            groups.setdefault(getattr(book, column.key), []).append(
+                {field: getattr(book, field) for field in DUPLICATE_FIELDS}
+            )
+        report[name] = [{"key": key, "books": books} for key, books in groups.items()]
+    return report
+
+
+def book_to_dict(book: Book) -> dict:
+    """Serialize a book together with the collections it belongs to"""
+    return {
+        **book.model_dump(),
+        "collections": [
+            {"id": collection.id, "name": collection.name}
+            for collection in book.collections
+        ],
+    }
+
+
+# FTS5 index over Book.title/author/review, created and kept in sync by migrations
+book_fts = table("book_fts", column("rowid"))
+_book_fts = literal_column("book_fts")
+SEARCH_WEIGHTS = (10.0, 5.0, 1.0)
+HIGHLIGHT_TAGS = ("<mark>", "</mark>")
+
+
+def fts_match_query(query: str) -> str:
+    """Turn free text into an FTS5 query matching every word as a prefix"""
+    return " ".join(f'"{term}"*' for term in re.findall(r"\w+", query))
+
+
+def search_books(
+    session: Session,
+    query: str,
+    limit: int = 20,
+    visibility: Optional[BookVisibility] = None,
+) -> List[Tuple[Book, dict]]:
+    """Books matching query, best first by weighted bm25, each with highlighted matches"""
+    match = fts_match_query(query)
+    if not match:
+        return []
+
+    statement = (
+        select(
+            Book,
+            func.highlight(_book_fts, 0, *HIGHLIGHT_TAGS).label("title"),
+            func.highlight(_book_fts, 1, *HIGHLIGHT_TAGS).label("author"),
+            func.snippet(_book_fts, 2, *HIGHLIGHT_TAGS, "…", 16).label("review"),
+        )
+        .select_from(book_fts)
+        .join(Book, Book.id == book_fts.c.rowid)
+        .where(_book_fts.op("MATCH")(match))
+        .options(selectinload(Book.collections))
+        .order_by(func.bm25(_book_fts, *SEARCH_WEIGHTS))
+        .limit(limit)
+    )
+    if visibility:
+        statement = statement.where(Book.visibility == visibility)
+
+    return [
+        (book, {"title": title, "author": author, "review": review or None})
+        for book, title, author, review in session.exec(statement).all()
+    ]
+
+
+book_content_fts = table("book_content_fts", column("rowid"), column("page"))
+_book_content_fts = literal_column("book_content_fts")
+
+
+def search_book_content(
+    session: Session,
+    query: str,
+    limit: int = 20,
+    visibility: Optional[BookVisibility] = None,
+) -> List[dict]:
+    """Passages of indexed book text matching query, best first"""
+    match = fts_match_query(query)
+    if not match:
+        return []
+
+    statement = (
+        select(
+            Book.id,
+            Book.title,
+            Book.author,
+            Book.file_type,
+            book_content_fts.c.page,
+            func.snippet(_book_content_fts, 0, *HIGHLIGHT_TAGS, "…", 24).label("snippet"),
+        )
+        .select_from(book_content_fts)
+        .join(Book, Book.id == book_content_fts.c.rowid.op(">>")(CHUNK_ID_BITS))
+        .where(_book_content_fts.op("MATCH")(match))
+        .order_by(func.bm25(_book_content_fts))
+        .limit(limit)
+    )
+    if visibility:
+        statement = statement.where(Book.visibility == visibility)
+
+    return [
+        {
+            "book_id": row.id,
+            "title": row.title,
+            "author": row.author,
+            "file_type": row.file_type,
+            "page": row.page,
+            "snippet": row.snippet,
+        }
+        for row in session.exec(statement).all()
+    ]
+
+
+# Last change of every book, collection and membership, kept by triggers (see migrations)
+sync_change = table(
+    "sync_change",
+    column("seq"),
+    column("entity"),
+    column("entity_id"),
+    column("collection_id"),
+    column("deleted"),
+)
+
+
+def get_changes(session: Session, since: int = 0, limit: int = 1000) -> dict:
+    """Changes after sync token since; max(seq) is read first, so the token never leads the data"""
+    last_seq = session.exec(select(func.max(sync_change.c.seq))).one() or 0
+    # A token from another (e.g. restored) database gets a full sync
+    reset = since > last_seq
+    if reset:
+        since = 0
+
+    changes = session.exec(
+        select(*sync_change.c)
+        .where(sync_change.c.seq > since)
+        .order_by(sync_change.c.seq)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    changed = {"book": [], "collection": [], "membership": []}
+    deleted = {"book": [], "collection": [], "membership": []}
+    for change in changes:
+        key = (change.entity_id, change.collection_id)
+        (deleted if change.deleted else changed)[change.entity].append(key)
+
+    books = collections = memberships = []
+    if changed["book"]:
+        ids = [book_id for book_id, _ in changed["book"]]
+        books = session.exec(select(Book).where(Book.id.in_(ids))).all()
+    if changed["collection"]:
+        ids = [collection_id for collection_id, _ in changed["collection"]]
+        collections = session.exec(select(Collection).where(Collection.id.in_(ids))).all()
+    if changed["membership"]:
+        memberships = session.exec(
+            select(BookCollection).where(
+                tuple_(BookCollection.book_id, BookCollection.collection_id).in_(
+                    changed["membership"]
+                )
+            )
+        ).all()
+
+    return {
+        "token": str(changes[-1].seq if has_more else last_seq),
+        "has_more": has_more,
+        "reset": reset,
+        "books": books,
+        "collections": collections,
+        "memberships": memberships,
+        "deleted": {
+            "books": [book_id for book_id, _ in deleted["book"]],
+            "collections": [collection_id for collection_id, _ in deleted["collection"]],
+            "memberships": [
+                {"book_id": book_id, "collection_id": collection_id}
+                for book_id, collection_id in deleted["membership"]
+            ],
+        },
+    }
 
 
 def change_visibility(session: Session, book_id: int):
@@ -151,26 +542,91 @@ def change_visibility(session: Session, book_id: int):
     return None
 
 
+def local_timestamp(client_ts: Optional[datetime]) -> Optional[datetime]:
+    """A client timestamp as naive local time, clamped to now against fast device clocks"""
+    if client_ts is None:
+        return None
+    if client_ts.tzinfo is not None:
+        client_ts = client_ts.astimezone().replace(tzinfo=None)
+    return min(client_ts, datetime.now())
+
+
+def _apply_progress(book: Book, progress_data: dict) -> bool:
+    """Apply one progress update unless it is older than the last progress write"""
+    client_ts = local_timestamp(progress_data.get("client_ts"))
+    if (
+        client_ts is not None
+        and book.progress_updated_at
+        and client_ts < book.progress_updated_at
+    ):
+        return False
+
+    book.progress = progress_data.get("progress", book.progress)
+    current_page = progress_data.get("current_page", book.current_page)
+    if current_page is not None:
+        book.current_page = current_page
+    status_str = progress_data.get("status", None)
+    if status_str:
+        book.status = status_str
+    book.progress_updated_at = client_ts or datetime.now()
+    book.last_updated = datetime.now()
+    return True
+
+
 def update_book_progress(session: Session, book_id: int, progress_data: dict):
     book = session.get(Book, book_id)
     if book:
-        progress = progress_data.get("progress", book.progress)
-        current_page = progress_data.get("current_page", book.current_page)
-        status_str = progress_data.get("status", None)
-        book.progress = progress
-        if current_page is not None:
-            book.current_page = current_page
-        if status_str:
-            book.status = status_str
-
-        book.last_updated = datetime.now()
-        session.add(book)
-        session.commit()
-        session.refresh(book)
+        if _apply_progress(book, progress_data):
+            session.add(book)
+            session.commit()
+            session.refresh(book)
         return book
     return None
 
 
+def update_books_progress(session: Session, updates: List[dict]) -> dict:
+    """Apply many progress updates in one transaction; the latest client_ts wins"""
+    book_ids = {update["book_id"] for update in updates}
+    books = {
+        book.id: book
+        for book in session.exec(select(Book).where(Book.id.in_(book_ids))).all()
+    }
+    result = {"updated": [], "stale": [], "not_found": sorted(book_ids - set(books))}
+
+    received_at = datetime.now()
+    ordered = sorted(
+        (update for update in updates if update["book_id"] in books),
+        key=lambda update: local_timestamp(update.get("client_ts")) or received_at,
+    )
+    applied = set()
+    for update in ordered:
+        if _apply_progress(books[update["book_id"]], update):
+            applied.add(update["book_id"])
+    session.commit()
+
+    result["updated"] = sorted(applied)
+    result["stale"] = sorted(set(books) - applied)
+    return result
+
+
+def ensure_book_cover(session: Session, book: Book) -> Optional[str]:
+    """Render a PDF's deferred cover now if the background job has not yet"""
+    if book.cover_path is not None or book.file_type != "pdf":
+        return book.cover_path
+    if not os.path.isfile(book.file_path):
+        return None
+
+    cover_path = PDFScanner.extract_cover(book.file_path)
+    # A failure is recorded too, so the PDF is not opened again on every request
+    book.cover_path = cover_path or NO_COVER
+    if cover_path:
+        book.last_updated = datetime.now()
+    session.add(book)
+    session.commit()
+    session.refresh(book)
+    return cover_path
+
+
 def update_book_rating_and_review(
     session: Session, book_id: int, rating_stars: int, review: Optional[str]
 ):
@@ -186,100 +642,109 @@ def update_book_rating_and_review(
     return None
 
 
-def scan_books_directory(session: Session, books_path: str = "./books") -> dict:
+def scan_books_directory(
+    session: Session,
+    books_path: str = "./books",
+    workers: Optional[int] = None,
+    incremental: bool = True,
+    recursive: bool = True,
+    include: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """Scan books_path (and its subfolders) for EPUB/PDF files"""
     os.makedirs("covers", exist_ok=True)
     scanned_files = 0
-    new_books = 0
-    errors = 0
-
-    try:
-        for filename in os.listdir(books_path):
-            file_path = os.path.join(books_path, filename)
-
-            if not os.path.isfile(file_path):
-                continue
 
+    def report(stats: dict):
+        if on_progress:
+            on_progress({"scanned_files": scanned_files, **stats})
+
+    manifest = ScanManifest(session, books_path)
+    engine = ScanEngine(
+        session,
+        workers=workers,
+        manifest=manifest,
+        on_progress=report,
+        should_stop=should_stop,
+    )
+
+    skipped_paths = []
+
+    def pending_files():
+        nonlocal scanned_files
+        for file_path, file_stat in walk_files(
+            books_path,
+            include=include,
+            exclude=exclude,
+            recursive=recursive,
+            skipped=skipped_paths,
+        ):
             scanned_files += 1
-            existing_book = session.exec(
-                select(Book).where(Book.file_path == file_path)
-            ).first()
-
-            if existing_book:
-                continue
-
-            if filename.lower().endswith(".epub"):
-                book_data = process_epub_file(file_path)
-            elif filename.lower().endswith(".pdf"):
-                book_data = process_pdf_file(file_path)
-            else:
+            if scanned_files % 500 == 0:
+                report(engine.stats())
+            if not is_book_file(file_path):
                 continue
 
-            if book_data:
-                create_book(session, book_data)
-                new_books += 1
-            else:
-                errors += 1
+            key = (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+            if manifest.needs_processing(file_path, key, incremental):
+                yield file_path, key
 
+    try:
+        stats = engine.run(pending_files())
+        if engine.cancelled:
+            return {
+                "status": "cancelled",
+                "message": "Scanning cancelled",
+                "scanned_files": scanned_files,
+                **stats,
+            }
+        # Known files this walk would not have listed are left as they are
+        skipped_prefixes = tuple(os.path.join(path, "") for path in skipped_paths)
+        missing_files = manifest.mark_missing(
+            file_path
+            for file_path in manifest.unseen
+            if walk_includes(books_path, file_path, include, exclude, recursive)
+            and file_path not in skipped_paths
+            and not file_path.startswith(skipped_prefixes)
+        )
+        fingerprinted_books = fingerprint_books(session, should_stop=should_stop)
     except Exception as e:
+        session.rollback()
         return {
             "status": "error",
             "message": f"Scanning failed: {str(e)}",
             "scanned_files": scanned_files,
-            "new_books": new_books,
-            "errors": errors,
+            **engine.stats(),
         }
 
+    report(stats)
     return {
         "status": "success",
         "message": "Scanning completed",
         "scanned_files": scanned_files,
-        "new_books": new_books,
-        "errors": errors,
+        "missing_files": missing_files,
+        "fingerprinted_books": fingerprinted_books,
+        **stats,
     }
 
 
-def process_epub_file(file_path: str) -> Optional[dict]:
-    """Process a single EPUB file and return book data"""
-    try:
-        metadata = EPUBScanner.extract_metadata(file_path)
-
-        return {
-            "title": metadata["title"],
-            "author": metadata["author"],
-            "file_path": file_path,
-            "file_type": "epub",
-            "file_size": EPUBScanner.get_file_size(file_path),
-            "pages": metadata["pages"],
-            "cover_path": metadata["cover_path"],
-            "progress": 0.0,
-            "current_page": 0,
-            "status": BookStatus.UNREAD,
-        }
-    except Exception as e:
-        print(f"Error processing EPUB {file_path}: {e}")
-        return None
-
-
-def process_pdf_file(file_path: str) -> Optional[dict]:
-    """Process a single PDF file and return book data"""
-    try:
-        metadata = PDFScanner.extract_metadata(file_path)
-
-        return {
-            "title": metadata["title"],
-            "author": metadata["author"],
-            "file_path": file_path,
-            "file_type": "pdf",
-            "file_size": PDFScanner.get_file_size(file_path),
-            "pages": metadata["pages"],
-            "cover_path": metadata["cover_path"],
-            "progress": 0.0,
-            "current_page": 0,
-            "status": BookStatus.UNREAD,
-        }
-    except Exception as e:
-        print(f"Error processing PDF {file_path}: {e}")
-        return None
+def isbn_book_data(isbn: str, metadata: dict) -> dict:
+    """Book row for a book known only by its ISBN"""
+    return {
+        "title": metadata["title"],
+        "author": metadata["author"],
+        "file_path": f"ISBN:{isbn}",
+        "file_type": "ISBN",
+        "file_size": 0,
+        "pages": metadata.get("pages"),
+        "cover_path": metadata["cover_url"],
+        "title_key": title_key(metadata["title"], metadata["author"]),
+        "progress": 0.0,
+        "current_page": 0,
+        "status": BookStatus.UNREAD,
+    }
 
 
 def add_book_from_isbn(isbn: str, session: Session) -> Optional[Book]:
@@ -295,17 +760,4 @@ def add_book_from_isbn(isbn: str, session: Session) -> Optional[Book]:
     if not metadata:
         return None
 
-    book_data = {
-        "title": metadata["title"],
-        "author": metadata["author"],
-        "file_path": f"ISBN:{isbn}",
-        "file_type": "ISBN",
-        "file_size": 0,
-        "pages": metadata.get("pages"),
-        "cover_path": metadata["cover_url"],
-        "progress": 0.0,
-        "current_page": 0,
-        "status": BookStatus.UNREAD,
-    }
-
-    return create_book(session, book_data)
+    return create_book(session, isbn_book_data(isbn, metadata))
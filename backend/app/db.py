@@ -1,12 +1,48 @@
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
 import os
+from .migrations import run_migrations
 
-DATABASE_URL = "sqlite:///./book-lib.db"
+DATABASE_URL = os.getenv("LOCALREADS_DATABASE_URL", "sqlite:///./book-lib.db")
+SQL_ECHO = os.getenv("LOCALREADS_SQL_ECHO", "").lower() in ("1", "true", "yes")
 
-engine = create_engine(DATABASE_URL, echo=True)
+# Applied to every new SQLite connection. WAL lets readers carry on while a
+# progress update is being written, and busy_timeout makes a writer wait for
+# the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("LOCALREADS_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("LOCALREADS_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "cache_size": int(os.getenv("LOCALREADS_SQLITE_CACHE_KB", "65536")) * -1,
+    "mmap_size": int(os.getenv("LOCALREADS_SQLITE_MMAP_MB", "256")) * 1024 * 1024,
+    "busy_timeout": int(os.getenv("LOCALREADS_SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": "MEMORY",
+}
+DB_POOL_SIZE = int(os.getenv("LOCALREADS_DB_POOL_SIZE", "8"))
+DB_MAX_OVERFLOW = int(os.getenv("LOCALREADS_DB_MAX_OVERFLOW", "8"))
+
+if DATABASE_URL.startswith("sqlite"):
+    engine = create_engine(
+        DATABASE_URL,
+        echo=SQL_ECHO,
+        # FastAPI runs sync endpoints in a thread pool, so a pooled connection
+        # is not tied to the thread that opened it
+        connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+else:
+    engine = create_engine(DATABASE_URL, echo=SQL_ECHO)
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
 
 def get_session():
     with Session(engine) as session:
@@ -0,0 +1,55 @@
+import hashlib
+import os
+import re
+import unicodedata
+from typing import Optional
+
+_BRACKETED = re.compile(r"[\(\[][^\)\]]*[\)\]]")
+_NON_WORD = re.compile(r"[^\w\s]")
+_LEADING_ARTICLE = re.compile(r"^(the|a|an)\s+")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = _NON_WORD.sub(" ", text.casefold().replace("_", " "))
+    return " ".join(text.split())
+
+
+def title_key(title: Optional[str], author: Optional[str]) -> Optional[str]:
+    """Normalized "title|author" used to find the same book in other files.
+
+    Case, accents, punctuation, a leading article and bracketed suffixes
+    such as "(Dune, #1)" are ignored in the title; author words are sorted,
+    so "Herbert, Frank" and "Frank Herbert" match.
+    """
+    title = _LEADING_ARTICLE.sub("", _normalize(_BRACKETED.sub("", title or "")))
+    if not title:
+        return None
+    if not author or author == "Unknown Author":
+        author = ""
+    author = " ".join(sorted(_normalize(author).split()))
+    return f"{title}|{author}"
+
+
+# KOReader identifies a document by the MD5 of 1 KiB samples taken at 0 and
+# 1 KiB * 4**i, or by the MD5 of its file name, depending on a device setting
+PARTIAL_MD5_SAMPLE = 1024
+
+
+def partial_md5(file_path: str) -> str:
+    """KOReader's "binary" document digest (util.partialMD5)"""
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for offset in [0] + [PARTIAL_MD5_SAMPLE << (2 * i) for i in range(11)]:
+            f.seek(offset)
+            sample = f.read(PARTIAL_MD5_SAMPLE)
+            if not sample:
+                break
+            md5.update(sample)
+    return md5.hexdigest()
+
+
+def filename_md5(file_path: str) -> str:
+    """KOReader's "file name" document digest"""
+    return hashlib.md5(os.path.basename(file_path).encode()).hexdigest()
@@ -0,0 +1,170 @@
+import csv
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, or_, select
+from .crud import isbn_book_data
+from .fingerprint import title_key
+from .models import Book, BookStatus
+from .utils import OPENLIBRARY_COVERS_URL, fetch_metadata_from_isbn
+
+IMPORT_CONCURRENCY = int(os.getenv("LOCALREADS_IMPORT_CONCURRENCY", "8"))
+IMPORT_BATCH_SIZE = 100
+
+# Goodreads "Exclusive Shelf" -> reading status
+GOODREADS_SHELVES = {
+    "read": BookStatus.FINISHED,
+    "currently-reading": BookStatus.READING,
+    "to-read": BookStatus.UNREAD,
+}
+
+
+def normalize_isbn(value: Optional[str]) -> Optional[str]:
+    """Digits (and a trailing X) of an ISBN-10/13, as Goodreads' ="..." cells too"""
+    isbn = re.sub(r"[^0-9Xx]", "", value or "").upper()
+    if len(isbn) == 13 and isbn.isdigit():
+        return isbn
+    if len(isbn) == 10 and isbn[:9].isdigit():
+        return isbn
+    return None
+
+
+def iter_isbn_entries(isbns: Iterable[str]) -> Iterator[dict]:
+    for value in isbns:
+        yield {"isbn": normalize_isbn(value), "source": value}
+
+
+def _int_or_none(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_goodreads_entries(csv_path: str) -> Iterator[dict]:
+    """Read a Goodreads library export one row at a time"""
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            authors = [row.get("Author"), *(row.get("Additional Authors") or "").split(",")]
+            status = GOODREADS_SHELVES.get(row.get("Exclusive Shelf"), BookStatus.UNREAD)
+            yield {
+                "isbn": normalize_isbn(row.get("ISBN13")) or normalize_isbn(row.get("ISBN")),
+                "goodreads_id": (row.get("Book Id") or "").strip() or None,
+                "source": row.get("Title") or row.get("Book Id"),
+                "title": (row.get("Title") or "").strip() or None,
+                "author": ", ".join(a.strip() for a in authors if a and a.strip()) or None,
+                "pages": _int_or_none(row.get("Number of Pages")),
+                "rating_stars": _int_or_none(row.get("My Rating")) or 0,
+                "review": (row.get("My Review") or "").strip() or None,
+                "status": status,
+                "progress": 1.0 if status == BookStatus.FINISHED else 0.0,
+            }
+
+
+def _import_path(entry: dict) -> Optional[str]:
+    """Stable file_path of an imported book: its ISBN, else its Goodreads book id"""
+    if entry["isbn"]:
+        return f"ISBN:{entry['isbn']}"
+    if entry.get("goodreads_id"):
+        return f"GOODREADS:{entry['goodreads_id']}"
+    return None
+
+
+def _fetch_metadata(entry: dict) -> Optional[dict]:
+    return fetch_metadata_from_isbn(entry["isbn"]) if entry["isbn"] else None
+
+
+def _book_data(entry: dict, metadata: Optional[dict]) -> Optional[dict]:
+    """Merge fetched metadata with what the import itself provided"""
+    if metadata is None:
+        if not entry.get("title"):
+            return None
+        metadata = {
+            "title": entry["title"],
+            "author": entry.get("author") or "Unknown Author",
+            "pages": entry.get("pages"),
+            "cover_url": (
+                f"{OPENLIBRARY_COVERS_URL}/b/isbn/{entry['isbn']}-L.jpg" if entry["isbn"] else None
+            ),
+        }
+    book_data = isbn_book_data(entry["isbn"], metadata)
+    if not entry["isbn"]:
+        book_data.update(file_path=_import_path(entry), file_type="GOODREADS")
+    for field in ("title", "author", "pages", "rating_stars", "review", "status", "progress"):
+        if entry.get(field) is not None:
+            book_data[field] = entry[field]
+    book_data["title_key"] = title_key(book_data["title"], book_data["author"])
+    return book_data
+
+
+def import_books(
+    session: Session,
+    entries: Iterable[dict],
+    on_progress: Optional[Callable[[dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """Import ISBN entries, IMPORT_BATCH_SIZE at a time.
+
+    Books already in the library are skipped using one query for every
+    ``ISBN:`` and ``GOODREADS:`` path up front. Metadata for each batch is
+    fetched with at most IMPORT_CONCURRENCY requests in flight, and the batch
+    is inserted in one statement and committed; books another import inserted
+    meanwhile are ignored. Fields given by the entries (a Goodreads title,
+    rating, review or shelf) take precedence over fetched metadata, and
+    Goodreads rows without an ISBN are imported from the CSV alone.
+    """
+    known = set(
+        session.exec(
+            select(Book.file_path).where(
+                or_(Book.file_path.startswith("ISBN:"), Book.file_path.startswith("GOODREADS:"))
+            )
+        ).all()
+    )
+    stats = {"processed": 0, "imported": 0, "duplicates": 0, "invalid": 0, "not_found": 0}
+    status = "success"
+    entries = iter(entries)
+
+    with ThreadPoolExecutor(max_workers=IMPORT_CONCURRENCY, thread_name_prefix="import") as pool:
+        while True:
+            if should_stop and should_stop():
+                status = "cancelled"
+                break
+            batch = list(islice(entries, IMPORT_BATCH_SIZE))
+            if not batch:
+                break
+            stats["processed"] += len(batch)
+
+            pending = []
+            for entry in batch:
+                path = _import_path(entry)
+                if path is None:
+                    stats["invalid"] += 1
+                elif path in known:
+                    stats["duplicates"] += 1
+                else:
+                    known.add(path)
+                    pending.append(entry)
+
+            metadata = pool.map(_fetch_metadata, pending)
+            rows = []
+            for entry, entry_metadata in zip(pending, metadata):
+                book_data = _book_data(entry, entry_metadata)
+                if book_data is None:
+                    stats["not_found"] += 1
+                else:
+                    rows.append(Book(**book_data).model_dump(exclude={"id"}))
+
+            if rows:
+                result = session.exec(
+                    insert(Book).values(rows).on_conflict_do_nothing(index_elements=["file_path"])
+                )
+                session.commit()
+                stats["imported"] += result.rowcount
+                stats["duplicates"] += len(rows) - result.rowcount
+            if on_progress:
+                on_progress(dict(stats))
+
+    return {"status": status, **stats}
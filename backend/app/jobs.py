@@ -0,0 +1,248 @@
+import hashlib
+import os
+import threading
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+from sqlmodel import Session
+from .db import engine
+from .content_index import CONTENT_INDEXING, index_pending_content
+from .crud import scan_books_directory
+from .importer import import_books, iter_goodreads_entries, iter_isbn_entries
+from .scan_engine import render_pending_covers
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class Job:
+    """A unit of background work and the progress it has reported so far"""
+
+    def __init__(self, kind: str, key: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = JobStatus.PENDING
+        self.progress: dict = {}
+        self.result: Optional[dict] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._cancel_event = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (JobStatus.PENDING, JobStatus.RUNNING)
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def update_progress(self, progress: dict):
+        self.progress = progress
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "key": self.key,
+            "status": self.status,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "cancel_requested": self.cancel_requested,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobManager:
+    """Run jobs on daemon threads, coalescing active jobs with the same key.
+
+    Submitting a job whose (kind, key) matches one that is still pending or
+    running returns that job instead of starting a second one. Only the most
+    recent ``max_finished`` finished jobs are kept for polling.
+    """
+
+    def __init__(self, max_finished: int = 50):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[Tuple[str, str], Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, key: str, target: Callable[[Job], dict]) -> Job:
+        with self._lock:
+            existing = self._active.get((kind, key))
+            if existing and existing.active:
+                return existing
+
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            self._active[(kind, key)] = job
+            self._prune()
+
+        thread = threading.Thread(
+            target=self._run, args=(job, target), name=f"{kind}-{job.id}", daemon=True
+        )
+        thread.start()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list:
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job and job.active:
+            job.cancel()
+        return job
+
+    def _run(self, job: Job, target: Callable[[Job], dict]):
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now()
+        try:
+            job.result = target(job)
+            result_status = (job.result or {}).get("status")
+            if result_status == "error":
+                job.status = JobStatus.FAILED
+                job.error = job.result.get("message")
+            elif result_status == "cancelled" or (
+                job.cancel_requested and result_status is None
+            ):
+                job.status = JobStatus.CANCELLED
+            else:
+                job.status = JobStatus.COMPLETED
+        except Exception as e:
+            traceback.print_exc()
+            job.status = JobStatus.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                if self._active.get((job.kind, job.key)) is job:
+                    del self._active[(job.kind, job.key)]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager()
+
+
+def submit_cover_job(workers: Optional[int] = None) -> Job:
+    """Render deferred PDF covers in the background"""
+
+    def run(job: Job) -> dict:
+        with Session(engine) as session:
+            return render_pending_covers(
+                session,
+                workers=workers,
+                on_progress=job.update_progress,
+                should_stop=lambda: job.cancel_requested,
+            )
+
+    return job_manager.submit("covers", "pdf", run)
+
+
+def submit_content_job() -> Job:
+    """Index the text of books whose files changed since they were last indexed"""
+
+    def run(job: Job) -> dict:
+        with Session(engine) as session:
+            return index_pending_content(
+                session,
+                on_progress=job.update_progress,
+                should_stop=lambda: job.cancel_requested,
+            )
+
+    return job_manager.submit("content", "books", run)
+
+
+def submit_scan_job(
+    books_path: str, index_content: Optional[bool] = None, **scan_options
+) -> Job:
+    """Start a background scan of books_path, or join a running one with the same options.
+
+    Once the scan has stored its books, a cover job renders the PDF covers
+    the scan deferred and, when index_content is on (by default when
+    LOCALREADS_INDEX_CONTENT is set), a content job indexes the books' text.
+    """
+    if index_content is None:
+        index_content = CONTENT_INDEXING
+
+    def run(job: Job) -> dict:
+        with Session(engine) as session:
+            result = scan_books_directory(
+                session,
+                books_path,
+                on_progress=job.update_progress,
+                should_stop=lambda: job.cancel_requested,
+                **scan_options,
+            )
+        if result["status"] == "success":
+            result["cover_job_id"] = submit_cover_job(scan_options.get("workers")).id
+            if index_content:
+                result["content_job_id"] = submit_content_job().id
+        return result
+
+    # Only identical requests share a job; the worker count changes nothing
+    # about what a scan does, every other option does
+    options = sorted(
+        (name, sorted(value) if isinstance(value, list) else value)
+        for name, value in {"index_content": index_content, **scan_options}.items()
+        if name != "workers" and value is not None
+    )
+    key = f"{os.path.realpath(books_path)}?{urlencode(options, doseq=True, safe='*/')}"
+    return job_manager.submit("scan", key, run)
+
+
+def submit_isbn_import_job(isbns: List[str]) -> Job:
+    """Import a list of ISBNs in the background; the same list joins its running job"""
+
+    def run(job: Job) -> dict:
+        with Session(engine) as session:
+            return import_books(
+                session,
+                iter_isbn_entries(isbns),
+                on_progress=job.update_progress,
+                should_stop=lambda: job.cancel_requested,
+            )
+
+    key = hashlib.sha1("\n".join(sorted(set(isbns))).encode()).hexdigest()
+    return job_manager.submit("import", key, run)
+
+
+def submit_goodreads_import_job(csv_path: str) -> Job:
+    """Import a Goodreads library export saved at csv_path, then delete the file"""
+
+    def run(job: Job) -> dict:
+        try:
+            with Session(engine) as session:
+                return import_books(
+                    session,
+                    iter_goodreads_entries(csv_path),
+                    on_progress=job.update_progress,
+                    should_stop=lambda: job.cancel_requested,
+                )
+        finally:
+            os.remove(csv_path)
+
+    return job_manager.submit("import", csv_path, run)
@@ -0,0 +1,161 @@
+"""KOReader progress sync, compatible with koreader-sync-server.
+
+Point KOReader's "Progress sync" plugin at this server (custom sync server
+http://<host>:8000). Devices identify a document by a digest of the file,
+either its partial MD5 or the MD5 of its file name; both are stored on Book
+at scan time, so a progress update finds its book with one index lookup
+and no file is read while serving requests.
+
+Positions are stored per user and document exactly as KOReader sent them,
+so devices of one user resume each other's position, and the book's
+progress is updated through update_book_progress.
+"""
+
+import hashlib
+import hmac
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, Header
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlmodel import Session, or_, select
+from .crud import update_book_progress
+from .db import get_session
+from .models import Book, BookStatus, KosyncProgress, KosyncUser
+
+router = APIRouter(tags=["kosync"])
+
+# code -> (HTTP status, message), as koreader-sync-server reports them
+KOSYNC_ERRORS = {
+    2001: (401, "Unauthorized"),
+    2002: (402, "Username is already registered."),
+    2003: (403, "Invalid request"),
+    2004: (403, "Field 'document' not provided."),
+}
+
+
+def kosync_error(code: int) -> JSONResponse:
+    status_code, message = KOSYNC_ERRORS[code]
+    return JSONResponse({"code": code, "message": message}, status_code=status_code)
+
+
+def _key_hash(key: str) -> str:
+    # KOReader sends the MD5 of the password as the key; only a hash of it is stored
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def kosync_user(
+    x_auth_user: Optional[str] = Header(None),
+    x_auth_key: Optional[str] = Header(None),
+    session: Session = Depends(get_session),
+) -> Optional[str]:
+    """The username the request's credentials belong to, or None"""
+    if not x_auth_user or not x_auth_key:
+        return None
+    user = session.get(KosyncUser, x_auth_user)
+    if user is None or not hmac.compare_digest(user.key_hash, _key_hash(x_auth_key)):
+        return None
+    return user.username
+
+
+def find_book_id(session: Session, document: str) -> Optional[int]:
+    """The book whose partial MD5 or file name MD5 is the document digest"""
+    return session.exec(
+        select(Book.id)
+        .where(or_(Book.partial_md5 == document, Book.filename_md5 == document))
+        .order_by(Book.id)
+    ).first()
+
+
+class KosyncUserData(BaseModel):
+    username: str | None = None
+    password: str | None = None
+
+
+class KosyncProgressData(BaseModel):
+    document: str | None = None
+    progress: str | None = None
+    percentage: float | None = None
+    device: str | None = None
+    device_id: str | None = None
+
+
+@router.post("/users/create", status_code=201)
+def create_user(data: KosyncUserData, session: Session = Depends(get_session)):
+    if not data.username or not data.password:
+        return kosync_error(2003)
+    if session.get(KosyncUser, data.username) is not None:
+        return kosync_error(2002)
+    session.add(KosyncUser(username=data.username, key_hash=_key_hash(data.password)))
+    session.commit()
+    return {"username": data.username}
+
+
+@router.get("/users/auth")
+def authorize(username: Optional[str] = Depends(kosync_user)):
+    if username is None:
+        return kosync_error(2001)
+    return {"authorized": "OK"}
+
+
+@router.put("/syncs/progress")
+def update_progress(
+    data: KosyncProgressData,
+    username: Optional[str] = Depends(kosync_user),
+    session: Session = Depends(get_session),
+):
+    if username is None:
+        return kosync_error(2001)
+    if not data.document:
+        return kosync_error(2004)
+    if data.percentage is None or data.progress is None or not data.device:
+        return kosync_error(2003)
+
+    timestamp = int(time.time())
+    session.merge(
+        KosyncProgress(
+            username=username,
+            document=data.document,
+            progress=data.progress,
+            percentage=data.percentage,
+            device=data.device,
+            device_id=data.device_id or "",
+            timestamp=timestamp,
+        )
+    )
+    book_id = find_book_id(session, data.document)
+    if book_id is None:
+        # Still kept, so devices can sync documents that are not in the library
+        session.commit()
+    else:
+        progress = min(max(data.percentage, 0.0), 1.0)
+        progress_data = {
+            "progress": progress,
+            "status": BookStatus.FINISHED if progress >= 1.0 else BookStatus.READING,
+        }
+        # For paged documents (PDF) KOReader's position is the page number
+        if data.progress.isdigit():
+            progress_data["current_page"] = int(data.progress)
+        update_book_progress(session, book_id, progress_data)
+    return {"document": data.document, "timestamp": timestamp}
+
+
+@router.get("/syncs/progress/{document}")
+def get_progress(
+    document: str,
+    username: Optional[str] = Depends(kosync_user),
+    session: Session = Depends(get_session),
+):
+    if username is None:
+        return kosync_error(2001)
+    record = session.get(KosyncProgress, (username, document))
+    if record is None:
+        return {}
+    return {
+        "document": record.document,
+        "progress": record.progress,
+        "percentage": record.percentage,
+        "device": record.device,
+        "device_id": record.device_id,
+        "timestamp": record.timestamp,
+    }
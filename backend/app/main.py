@@ -1,14 +1,43 @@
-from fastapi import FastAPI, Depends, HTTPException
+import os
+import tempfile
+from datetime import datetime
+from fastapi import FastAPI, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import RedirectResponse
 from sqlmodel import Session
 from pydantic import BaseModel
 from .db import create_db_and_tables, get_session
-from .models import Book
+from .models import Book, BookStatus, BookVisibility
+from .jobs import (
+    job_manager,
+    submit_goodreads_import_job,
+    submit_isbn_import_job,
+    submit_scan_job,
+)
+from .kosync import router as kosync_router
+from .progress import progress_buffer
+from .scan_engine import MAX_SCAN_WORKERS
+from .response_cache import cached_json_response
+from .watcher import library_watcher
+from .covers import (
+    COVERS_DIR,
+    COVER_SIZES,
+    DEFAULT_COVER_SIZE,
+    CoverStaticFiles,
+    cover_file_response,
+    placeholder_response,
+    resolve_cover_file,
+)
 from .crud import (
-    get_books,
+    get_books_page,
+    get_book_by_id,
+    search_books,
+    search_book_content,
+    get_duplicate_books,
+    get_changes,
+    book_to_dict,
     update_book_progress,
-    scan_books_directory,
+    update_books_progress,
     update_book_rating_and_review,
     change_visibility,
     get_collections_db,
@@ -16,8 +45,12 @@ from .crud import (
     delete_collection_db,
     add_book_to_collection_db,
     remove_book_from_collection_db,
+    add_books_to_collections_db,
+    remove_books_from_collection_db,
+    replace_collection_books_db,
     get_collection_with_books_db,
     add_book_from_isbn,
+    ensure_book_cover,
 )
 
 app = FastAPI(title="Localreads")
@@ -33,14 +66,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
-app.mount("/covers", StaticFiles(directory="covers"), name="covers")
+os.makedirs(COVERS_DIR, exist_ok=True)
+app.mount("/covers", CoverStaticFiles(directory=COVERS_DIR), name="covers")
+app.include_router(kosync_router)
 
 
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    progress_buffer.start()
+    if library_watcher:
+        library_watcher.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    if library_watcher:
+        library_watcher.stop()
+    progress_buffer.stop()
 
 
 @app.get("/")
@@ -48,23 +94,145 @@ def read_root():
     return {"message": "Welcome to Localreads"}
 
 
-@app.get("/books/", response_model=list[Book])
-def read_books(sort_by: str = "title", session: Session = Depends(get_session)):
-    return get_books(session, sort_by)
+@app.get("/books/")
+def read_books(
+    request: Request,
+    sort_by: str = "title",
+    limit: int | None = Query(None, ge=1, le=1000),
+    cursor: str | None = None,
+    fields: str | None = None,
+    visibility: BookVisibility | None = None,
+    status: BookStatus | None = None,
+    session: Session = Depends(get_session),
+):
+    """List books; with limit, the next page's cursor is sent in X-Next-Cursor"""
+
+    def build():
+        try:
+            books, next_cursor = get_books_page(
+                session,
+                sort_by,
+                limit=limit,
+                cursor=cursor,
+                fields=[field.strip() for field in fields.split(",")] if fields else None,
+                visibility=visibility,
+                status=status,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        if fields:
+            return books, headers
+        return [book_to_dict(book) for book in books], headers
+
+    key = ("books", sort_by, limit, cursor, fields, visibility, status)
+    return cached_json_response(request, key, build)
+
+
+@app.get("/search")
+def search(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    visibility: BookVisibility | None = None,
+    session: Session = Depends(get_session),
+):
+    """Full-text search over titles, authors and reviews, best matches first"""
+    return [
+        {**book_to_dict(book), "highlights": highlights}
+        for book, highlights in search_books(session, q, limit, visibility)
+    ]
+
+
+@app.get("/sync")
+def sync(
+    since: str = "0",
+    limit: int = Query(1000, ge=1, le=5000),
+    session: Session = Depends(get_session),
+):
+    """Changes and deletions since a previous response's token ("0" for everything)"""
+    if not since.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    return get_changes(session, int(since), limit)
+
+
+# Declared before /books/{book_id} so the path is not taken for a book id
+@app.get("/books/search-content")
+def search_content(
+    q: str,
+    limit: int = Query(20, ge=1, le=100),
+    visibility: BookVisibility | None = None,
+    session: Session = Depends(get_session),
+):
+    """Search inside indexed books; each hit is a book, page and snippet"""
+    return search_book_content(session, q, limit, visibility)
+
+
+@app.get("/books/duplicates")
+def read_duplicate_books(session: Session = Depends(get_session)):
+    """Books stored twice (same file content) or in several formats (same title/author)"""
+    return get_duplicate_books(session)
 
 
-@app.get("/books/{book_id}", response_model=Book)
+@app.get("/books/{book_id}")
 def read_book(book_id: int, session: Session = Depends(get_session)):
+    book = get_book_by_id(session, book_id)
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return book_to_dict(book)
+
+
+@app.get("/books/{book_id}/cover")
+def read_book_cover(
+    book_id: int,
+    request: Request,
+    size: str = DEFAULT_COVER_SIZE,
+    session: Session = Depends(get_session),
+):
+    if size not in COVER_SIZES:
+        raise HTTPException(status_code=400, detail="Unknown cover size")
     book = session.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    if book.cover_path and book.cover_path.startswith(("http://", "https://")):
+        return RedirectResponse(book.cover_path)
+    cover_file = resolve_cover_file(ensure_book_cover(session, book), size)
+    # The book's cover may change, so clients revalidate against the ETag
+    if not cover_file:
+        return placeholder_response(book.title, request.headers, "no-cache")
+    return cover_file_response(cover_file, request.headers, "no-cache")
+
+
+@app.get("/placeholders/cover.svg")
+def read_placeholder_cover(title: str, request: Request):
+    return placeholder_response(title, request.headers)
 
 
 class ProgressUpdate(BaseModel):
     progress: float
     current_page: int | None = None
     status: str | None = None
+    client_ts: datetime | None = None
+
+
+class BookProgressUpdate(ProgressUpdate):
+    book_id: int
+
+
+class BulkProgressUpdate(BaseModel):
+    updates: list[BookProgressUpdate]
+
+
+@app.post("/books/progress")
+def update_progress_bulk(
+    bulk_update: BulkProgressUpdate, session: Session = Depends(get_session)
+):
+    """Apply many progress updates at once; the latest client_ts per book wins"""
+    updates = [update.model_dump() for update in bulk_update.updates]
+    if progress_buffer.enabled:
+        for update in updates:
+            progress_buffer.add(update)
+        return {"queued": sorted({update["book_id"] for update in updates})}
+    return update_books_progress(session, updates)
 
 
 @app.patch("/books/{book_id}/progress")
@@ -77,7 +245,19 @@ def update_progress(
         "progress": progress_update.progress,
         "current_page": progress_update.current_page,
         "status": progress_update.status,
+        "client_ts": progress_update.client_ts,
     }
+    if progress_buffer.enabled:
+        book = get_book_by_id(session, book_id)
+        if not book:
+            raise HTTPException(status_code=404, detail="Book not found")
+        pending = progress_buffer.add({"book_id": book_id, **prog_dict})
+        pending_fields = {
+            field: pending[field]
+            for field in ("progress", "current_page", "status")
+            if pending[field] is not None
+        }
+        return {**book.model_dump(), **pending_fields}
     updated_book = update_book_progress(session, book_id, prog_dict)
     if updated_book:
         return updated_book
@@ -103,12 +283,90 @@ def update_rating_review(
     raise HTTPException(status_code=404, detail="Book not found")
 
 
-@app.post("/scan/")
+@app.post("/scan/", status_code=202)
 def scan_books(
-    books_path: str = "/home/antoine/books", session: Session = Depends(get_session)
+    books_path: str = "/home/antoine/books",
+    workers: int | None = Query(None, ge=1, le=MAX_SCAN_WORKERS),
+    incremental: bool = True,
+    recursive: bool = True,
+    include: list[str] | None = Query(None),
+    exclude: list[str] | None = Query(None),
+    index_content: bool | None = None,
 ):
-    result = scan_books_directory(session, books_path)
-    return result
+    job = submit_scan_job(
+        books_path,
+        index_content=index_content,
+        workers=workers,
+        incremental=incremental,
+        recursive=recursive,
+        include=include,
+        exclude=exclude,
+    )
+    return job.to_dict()
+
+
+@app.get("/scan/")
+def list_scan_jobs():
+    return [job.to_dict() for job in job_manager.list() if job.kind == "scan"]
+
+
+@app.get("/scan/{job_id}")
+def read_scan_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job.to_dict()
+
+
+@app.delete("/scan/{job_id}")
+def cancel_scan_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job.to_dict()
+
+
+class IsbnImportData(BaseModel):
+    isbns: list[str]
+
+
+@app.post("/import/isbns", status_code=202)
+def import_isbns(import_data: IsbnImportData):
+    return submit_isbn_import_job(import_data.isbns).to_dict()
+
+
+@app.post("/import/goodreads", status_code=202)
+async def import_goodreads(request: Request):
+    """Import a Goodreads library export sent as the raw CSV request body.
+
+    The upload is streamed to a temporary file and parsed row by row by the
+    import job, so large exports are never held in memory.
+    """
+    with tempfile.NamedTemporaryFile("wb", prefix="goodreads-", suffix=".csv", delete=False) as f:
+        async for chunk in request.stream():
+            f.write(chunk)
+    return submit_goodreads_import_job(f.name).to_dict()
+
+
+@app.get("/import/")
+def list_import_jobs():
+    return [job.to_dict() for job in job_manager.list() if job.kind == "import"]
+
+
+@app.get("/import/{job_id}")
+def read_import_job(job_id: str):
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.to_dict()
+
+
+@app.delete("/import/{job_id}")
+def cancel_import_job(job_id: str):
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.to_dict()
 
 
 @app.get("/health")
@@ -140,8 +398,10 @@ async def create_collection(
 
 
 @app.get("/collections/")
-def get_collections(session: Session = Depends(get_session)):
-    return get_collections_db(session)
+def get_collections(request: Request, session: Session = Depends(get_session)):
+    return cached_json_response(
+        request, ("collections",), lambda: (get_collections_db(session), {})
+    )
 
 
 @app.delete("/collections/{collection_id}")
@@ -187,15 +447,84 @@ def add_book_to_collection(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.get("/collections/{collection_id}/books", response_model=list[Book])
-def get_collection_books(collection_id: int, session: Session = Depends(get_session)):
+class BookIdsData(BaseModel):
+    book_ids: list[int]
+
+
+class BooksToCollectionsData(BaseModel):
+    book_ids: list[int]
+    collection_ids: list[int]
+
+
+@app.post("/collections/{collection_id}/books/bulk")
+def add_books_to_collection(
+    collection_id: int, data: BookIdsData, session: Session = Depends(get_session)
+):
+    try:
+        added = add_books_to_collections_db(session, data.book_ids, [collection_id])
+        return {"added": added}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/collections/{collection_id}/books/bulk-delete")
+def remove_books_from_collection(
+    collection_id: int, data: BookIdsData, session: Session = Depends(get_session)
+):
+    try:
+        removed = remove_books_from_collection_db(session, collection_id, data.book_ids)
+        return {"removed": removed}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.put("/collections/{collection_id}/books")
+def replace_collection_books(
+    collection_id: int, data: BookIdsData, session: Session = Depends(get_session)
+):
     try:
-        books = get_collection_with_books_db(session, collection_id)
-        return books
+        return replace_collection_books_db(session, collection_id, data.book_ids)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/collections/books/bulk")
+def add_books_to_collections(
+    data: BooksToCollectionsData, session: Session = Depends(get_session)
+):
+    """Add every listed book to every listed collection"""
+    try:
+        added = add_books_to_collections_db(session, data.book_ids, data.collection_ids)
+        return {"added": added}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/collections/{collection_id}/books")
+def get_collection_books(
+    collection_id: int, request: Request, session: Session = Depends(get_session)
+):
+    def build():
+        try:
+            books = get_collection_with_books_db(session, collection_id)
+            return [book_to_dict(book) for book in books], {}
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    return cached_json_response(request, ("collection_books", collection_id), build)
 
 
 @app.post("/isbn/{isbn}")
 def import_from_isbn(isbn: str, session: Session = Depends(get_session)):
-    return add_book_from_isbn(isbn, session)
+    book = add_book_from_isbn(isbn, session)
+    if not book:
+        raise HTTPException(status_code=404, detail="No metadata found for this ISBN")
+    return book
@@ -0,0 +1,225 @@
+"""Versioned, in-place schema migrations for the SQLite database.
+
+``SQLModel.metadata.create_all`` creates missing tables (with every index
+the models declare) but never changes a table that already exists. Each
+migration below upgrades an existing database to what the models describe;
+they are written to be no-ops on a freshly created one. The schema version
+is kept in SQLite's ``PRAGMA user_version``.
+"""
+
+from datetime import datetime
+from typing import Callable, List, Tuple
+from sqlalchemy.engine import Connection, Engine
+from .fingerprint import filename_md5, title_key
+
+
+def _column_names(conn: Connection, table: str) -> set:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists"""
+    if column not in _column_names(conn, table):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+def _merge_duplicate_file_paths(conn: Connection):
+    """Fold books sharing a file_path into the oldest row before making it unique"""
+    duplicates = conn.exec_driver_sql(
+        "SELECT b.id, keep.id FROM book b "
+        "JOIN (SELECT file_path, MIN(id) AS id FROM book GROUP BY file_path "
+        "HAVING COUNT(*) > 1) keep ON keep.file_path = b.file_path "
+        "WHERE b.id != keep.id"
+    ).fetchall()
+    for duplicate_id, keep_id in duplicates:
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO bookcollection (book_id, collection_id, added_at) "
+            "SELECT ?, collection_id, added_at FROM bookcollection WHERE book_id = ?",
+            (keep_id, duplicate_id),
+        )
+        conn.exec_driver_sql("DELETE FROM bookcollection WHERE book_id = ?", (duplicate_id,))
+        conn.exec_driver_sql(
+            "UPDATE scannedfile SET book_id = ? WHERE book_id = ?", (keep_id, duplicate_id)
+        )
+        conn.exec_driver_sql("DELETE FROM book WHERE id = ?", (duplicate_id,))
+    if duplicates:
+        print(f"Merged {len(duplicates)} duplicate book rows sharing a file_path")
+
+
+def _v1_book_indexes(conn: Connection):
+    _merge_duplicate_file_paths(conn)
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_book_file_path ON book (file_path)"
+    )
+    for column in ("title", "progress", "status", "last_updated"):
+        conn.exec_driver_sql(
+            f"CREATE INDEX IF NOT EXISTS ix_book_{column} ON book ({column})"
+        )
+
+
+def _v2_book_search_index(conn: Connection):
+    # External-content FTS5 index: the text lives in book, the index only
+    # holds tokens. Triggers keep it in step with every write to book, and the
+    # update trigger only fires for the indexed columns, so progress updates
+    # never touch it.
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5("
+        "title, author, review, content='book', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS book_fts_insert AFTER INSERT ON book BEGIN "
+        "INSERT INTO book_fts (rowid, title, author, review) "
+        "VALUES (new.id, new.title, new.author, new.review); END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS book_fts_delete AFTER DELETE ON book BEGIN "
+        "INSERT INTO book_fts (book_fts, rowid, title, author, review) "
+        "VALUES ('delete', old.id, old.title, old.author, old.review); END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS book_fts_update "
+        "AFTER UPDATE OF title, author, review ON book BEGIN "
+        "INSERT INTO book_fts (book_fts, rowid, title, author, review) "
+        "VALUES ('delete', old.id, old.title, old.author, old.review); "
+        "INSERT INTO book_fts (rowid, title, author, review) "
+        "VALUES (new.id, new.title, new.author, new.review); END"
+    )
+    conn.exec_driver_sql("INSERT INTO book_fts (book_fts) VALUES ('rebuild')")
+
+
+def _v3_book_content_index(conn: Connection):
+    # Chunk rowids are (book_id << 20) | chunk number, see content_index.py,
+    # so a book's chunks are one rowid range
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS book_content_fts USING fts5("
+        "body, page UNINDEXED, tokenize='unicode61 remove_diacritics 2')"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS book_content_delete AFTER DELETE ON book BEGIN "
+        "DELETE FROM book_content_fts WHERE rowid BETWEEN old.id * 1048576 "
+        "AND old.id * 1048576 + 1048575; "
+        "DELETE FROM bookcontent WHERE book_id = old.id; END"
+    )
+
+
+def _v4_book_fingerprints(conn: Connection):
+    add_column(conn, "book", "content_hash", "VARCHAR")
+    add_column(conn, "book", "title_key", "VARCHAR")
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_book_content_hash ON book (content_hash)"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_book_title_key ON book (title_key)")
+    # Content hashes need the files and are filled in by the next scan
+    rows = conn.exec_driver_sql(
+        "SELECT id, title, author FROM book WHERE title_key IS NULL"
+    ).fetchall()
+    if rows:
+        conn.exec_driver_sql(
+            "UPDATE book SET title_key = ? WHERE id = ?",
+            [(title_key(title, author), book_id) for book_id, title, author in rows],
+        )
+
+
+# entity -> (table, columns stored as sync_change.entity_id and collection_id)
+_SYNC_ENTITIES = {
+    "book": ("book", "id", None),
+    "collection": ("collection", "id", None),
+    "membership": ("bookcollection", "book_id", "collection_id"),
+}
+
+
+def _v5_sync_changes(conn: Connection):
+    # One row per book, collection and membership, holding the sequence
+    # number of its last insert, update or delete; deletes stay as
+    # tombstones. Triggers catch every writer, and a sequence cannot go back
+    # in time the way last_updated (set from client clocks) can. Each change
+    # deletes the entity's row and inserts a fresh one, rather than INSERT OR
+    # REPLACE, which an outer INSERT OR IGNORE would override.
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS sync_change ("
+        "seq INTEGER PRIMARY KEY AUTOINCREMENT, entity VARCHAR NOT NULL, "
+        "entity_id INTEGER NOT NULL, collection_id INTEGER NOT NULL DEFAULT 0, "
+        "deleted BOOLEAN NOT NULL DEFAULT 0)"
+    )
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_sync_change_entity "
+        "ON sync_change (entity, entity_id, collection_id)"
+    )
+    for entity, (table, id_column, collection_column) in _SYNC_ENTITIES.items():
+        for event, row, deleted in (
+            ("insert", "new", 0),
+            ("update", "new", 0),
+            ("delete", "old", 1),
+        ):
+            entity_id = f"{row}.{id_column}"
+            collection_id = f"{row}.{collection_column}" if collection_column else "0"
+            conn.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_sync_{event} "
+                f"AFTER {event.upper()} ON {table} BEGIN "
+                f"DELETE FROM sync_change WHERE entity = '{entity}' "
+                f"AND entity_id = {entity_id} AND collection_id = {collection_id}; "
+                "INSERT INTO sync_change (entity, entity_id, collection_id, deleted) "
+                f"VALUES ('{entity}', {entity_id}, {collection_id}, {deleted}); END"
+            )
+        conn.exec_driver_sql(
+            "INSERT OR IGNORE INTO sync_change (entity, entity_id, collection_id) "
+            f"SELECT '{entity}', {id_column}, {collection_column or 0} FROM {table}"
+        )
+
+
+def _v6_koreader_digests(conn: Connection):
+    add_column(conn, "book", "partial_md5", "VARCHAR")
+    add_column(conn, "book", "filename_md5", "VARCHAR")
+    for column in ("partial_md5", "filename_md5"):
+        conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_book_{column} ON book ({column})")
+    # Like content hashes, partial MD5s need the files and come with the next scan
+    rows = conn.exec_driver_sql(
+        "SELECT id, file_path FROM book WHERE filename_md5 IS NULL "
+        "AND file_path NOT LIKE 'ISBN:%'"
+    ).fetchall()
+    if rows:
+        conn.exec_driver_sql(
+            "UPDATE book SET filename_md5 = ? WHERE id = ?",
+            [(filename_md5(file_path), book_id) for book_id, file_path in rows],
+        )
+
+
+def _v7_progress_timestamps(conn: Connection):
+    add_column(conn, "book", "progress_updated_at", "DATETIME")
+    # Best available guess for books read before: their last write, never in
+    # the future
+    conn.exec_driver_sql(
+        "UPDATE book SET progress_updated_at = MIN(last_updated, ?) "
+        "WHERE progress_updated_at IS NULL AND progress > 0",
+        (datetime.now().isoformat(" "),),
+    )
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "index hot Book lookup and sort columns", _v1_book_indexes),
+    (2, "full-text index over book title, author and review", _v2_book_search_index),
+    (3, "full-text index over book contents", _v3_book_content_index),
+    (4, "content hash and title/author fingerprints on books", _v4_book_fingerprints),
+    (5, "change log for delta sync", _v5_sync_changes),
+    (6, "KOReader document digests on books", _v6_koreader_digests),
+    (7, "separate progress write time for last-write-wins", _v7_progress_timestamps),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def run_migrations(engine: Engine) -> int:
+    """Apply pending migrations, each in its own transaction; return the version"""
+    with engine.connect() as conn:
+        version = conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+    for migration_version, description, migrate in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.exec_driver_sql(f"PRAGMA user_version = {migration_version}")
+        print(f"Applied migration {migration_version}: {description}")
+        version = migration_version
+    return version
@@ -19,20 +19,25 @@ class BookCollection(SQLModel, table=True):
 
 class Book(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    title: str
+    title: str = Field(index=True)
     author: str = "Unknown Author"
-    file_path: str
+    file_path: str = Field(unique=True, index=True)
     file_type: str
     file_size: int
     pages: Optional[int] = None
     cover_path: Optional[str] = None
-    progress: float = 0.0
+    progress: float = Field(default=0.0, index=True)
     current_page: int = 0
     rating_stars: int = 0
     review: Optional[str] = None
-    status: BookStatus = BookStatus.UNREAD
+    status: BookStatus = Field(default=BookStatus.UNREAD, index=True)
     visibility: BookVisibility = BookVisibility.VISIBLE
-    last_updated: datetime = Field(default_factory=datetime.now)
+    content_hash: Optional[str] = Field(default=None, index=True)
+    title_key: Optional[str] = Field(default=None, index=True)
+    partial_md5: Optional[str] = Field(default=None, index=True)
+    filename_md5: Optional[str] = Field(default=None, index=True)
+    last_updated: datetime = Field(default_factory=datetime.now, index=True)
+    progress_updated_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.now)
     
     collections: List["Collection"] = Relationship(
@@ -49,4 +54,34 @@ class Collection(SQLModel, table=True):
     books: List[Book] = Relationship(
         back_populates="collections",
         link_model=BookCollection
-    )
\ No newline at end of file
+    )
+
+class ScannedFile(SQLModel, table=True):
+    file_path: str = Field(primary_key=True)
+    book_id: Optional[int] = Field(default=None, foreign_key="book.id", index=True)
+    size: int
+    mtime_ns: int
+    inode: int
+    missing: bool = False
+    last_seen: datetime = Field(default_factory=datetime.now)
+
+class BookContent(SQLModel, table=True):
+    book_id: int = Field(foreign_key="book.id", primary_key=True)
+    size: int
+    mtime_ns: int
+    chunks: int = 0
+    indexed_at: datetime = Field(default_factory=datetime.now)
+
+class KosyncUser(SQLModel, table=True):
+    username: str = Field(primary_key=True)
+    key_hash: str
+    created_at: datetime = Field(default_factory=datetime.now)
+
+class KosyncProgress(SQLModel, table=True):
+    username: str = Field(foreign_key="kosyncuser.username", primary_key=True)
+    document: str = Field(primary_key=True)
+    progress: str
+    percentage: float
+    device: str
+    device_id: str
+    timestamp: int
@@ -0,0 +1,87 @@
+import os
+import threading
+import traceback
+from datetime import datetime
+from typing import Dict, Optional
+from sqlmodel import Session
+from .db import engine
+from .crud import local_timestamp, update_books_progress
+
+PROGRESS_FLUSH_SECONDS = float(os.getenv("LOCALREADS_PROGRESS_FLUSH_SECONDS", "0"))
+
+
+class ProgressBuffer:
+    """Coalesce progress updates in memory and write them out periodically.
+
+    Only the latest update per book is kept, by client timestamp (arrival
+    order for updates without one), so a reader turning pages produces one
+    write per book per ``interval`` instead of one per page. The buffer is
+    flushed by a background thread and once more when it is stopped.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.interval > 0
+
+    def add(self, update: dict) -> dict:
+        """Queue an update and return the book's pending state"""
+        client_ts = local_timestamp(update.get("client_ts")) or datetime.now()
+        update = {**update, "client_ts": client_ts}
+        with self._lock:
+            existing = self._pending.get(update["book_id"])
+            if existing and update["client_ts"] < existing["client_ts"]:
+                return existing
+            if existing:
+                update = {
+                    **existing,
+                    **{field: value for field, value in update.items() if value is not None},
+                }
+            self._pending[update["book_id"]] = update
+            return update
+
+    def flush(self) -> dict:
+        with self._lock:
+            updates, self._pending = list(self._pending.values()), {}
+        if not updates:
+            return {"updated": [], "stale": [], "not_found": []}
+        try:
+            with Session(engine) as session:
+                return update_books_progress(session, updates)
+        except Exception:
+            # Put the batch back unless a newer update arrived meanwhile
+            with self._lock:
+                for update in updates:
+                    self._pending.setdefault(update["book_id"], update)
+            raise
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="progress-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                traceback.print_exc()
+
+
+progress_buffer = ProgressBuffer(PROGRESS_FLUSH_SECONDS)
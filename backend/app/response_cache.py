@@ -0,0 +1,133 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import Response
+from .models import Book, BookCollection, Collection
+
+RESPONSE_CACHE_BYTES = int(os.getenv("LOCALREADS_RESPONSE_CACHE_MB", "64")) * 1024 * 1024
+
+# (body, etag, extra headers)
+CacheEntry = Tuple[bytes, str, dict]
+
+# Tables the cached responses are built from
+CACHED_TABLES = frozenset(
+    model.__tablename__ for model in (Book, Collection, BookCollection)
+)
+_TOUCHED = "response_cache_touched"
+
+
+class ResponseCache:
+    """Serialized JSON responses of read endpoints, dropped on every write.
+
+    Every committed write to CACHED_TABLES bumps ``version`` and empties the
+    cache (see the Session listeners below), whichever code path made it:
+    crud functions, scans, imports or the watcher. An entry built while a write
+    was committing is not stored, because the version it started from is no
+    longer current, so a cached response is never older than the data.
+    Entries are evicted least recently used first beyond ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, entry: CacheEntry, version: int):
+        size = len(entry[0])
+        with self._lock:
+            if version != self.version or size > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted[0])
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._size = 0
+
+
+response_cache = ResponseCache()
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flushed_tables(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if inspect(obj).mapper.local_table.name in CACHED_TABLES:
+            session.info[_TOUCHED] = True
+            return
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_executed_tables(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    table = getattr(orm_execute_state.statement, "table", None)
+    # Statements without a single target table (text) are assumed to write
+    if getattr(table, "name", None) in CACHED_TABLES or table is None:
+        orm_execute_state.session.info[_TOUCHED] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop(_TOUCHED, False):
+        response_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop(_TOUCHED, None)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def cached_json_response(
+    request: Request, key: Hashable, build: Callable[[], Tuple[Any, dict]]
+) -> Response:
+    """Serve key's JSON from the cache, building it with build() on a miss.
+
+    ``build`` returns the content and any extra headers to send with it. The
+    ETag is a hash of the body, so it survives invalidations that did not
+    change this response, and a matching If-None-Match gets a 304.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        version = response_cache.version
+        content, headers = build()
+        body = JSONResponse(jsonable_encoder(content)).body
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        entry = (body, etag, headers)
+        response_cache.put(key, entry, version)
+
+    body, etag, headers = entry
+    headers = {**headers, "etag": etag, "cache-control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
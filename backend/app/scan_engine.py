@@ -0,0 +1,569 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, delete, or_, select, update
+from .covers import NO_COVER
+from .fingerprint import filename_md5, partial_md5, title_key
+from .models import Book, BookStatus, ScannedFile
+from .scanners import EPUBScanner, PDFScanner
+from .scanners.base_scanner import FILE_HASH_PREFIX, BaseScanner
+
+SCAN_WORKERS = int(os.getenv("LOCALREADS_SCAN_WORKERS", "0")) or os.cpu_count() or 1
+# Upper bound for a requested worker count; parsing is CPU bound
+MAX_SCAN_WORKERS = max(SCAN_WORKERS, 2 * (os.cpu_count() or 1))
+SCAN_BATCH_SIZE = int(os.getenv("LOCALREADS_SCAN_BATCH_SIZE", "100"))
+# Manifest rows per INSERT; each row takes 7 of SQLite's bound variables
+MANIFEST_BATCH_SIZE = 500
+
+
+def process_epub_file(file_path: str) -> Optional[dict]:
+    """Process a single EPUB file and return book data"""
+    try:
+        metadata = EPUBScanner.extract_metadata(file_path)
+
+        return {
+            "title": metadata["title"],
+            "author": metadata["author"],
+            "file_path": file_path,
+            "file_type": "epub",
+            "file_size": EPUBScanner.get_file_size(file_path),
+            "pages": metadata["pages"],
+            "cover_path": metadata["cover_path"],
+            "content_hash": EPUBScanner.generate_file_hash(file_path),
+            "title_key": title_key(metadata["title"], metadata["author"]),
+            "partial_md5": partial_md5(file_path),
+            "filename_md5": filename_md5(file_path),
+            "progress": 0.0,
+            "current_page": 0,
+            "status": BookStatus.UNREAD,
+        }
+    except Exception as e:
+        print(f"Error processing EPUB {file_path}: {e}")
+        return None
+
+
+def process_pdf_file(file_path: str) -> Optional[dict]:
+    """Process a single PDF file and return book data"""
+    try:
+        metadata = PDFScanner.extract_metadata(file_path)
+
+        return {
+            "title": metadata["title"],
+            "author": metadata["author"],
+            "file_path": file_path,
+            "file_type": "pdf",
+            "file_size": PDFScanner.get_file_size(file_path),
+            "pages": metadata["pages"],
+            "cover_path": metadata["cover_path"],
+            "content_hash": PDFScanner.generate_file_hash(file_path),
+            "title_key": title_key(metadata["title"], metadata["author"]),
+            "partial_md5": partial_md5(file_path),
+            "filename_md5": filename_md5(file_path),
+            "progress": 0.0,
+            "current_page": 0,
+            "status": BookStatus.UNREAD,
+        }
+    except Exception as e:
+        print(f"Error processing PDF {file_path}: {e}")
+        return None
+
+
+def process_book_file(file_path: str) -> Optional[dict]:
+    """Dispatch a file to the scanner matching its extension"""
+    lower = file_path.lower()
+    if lower.endswith(".epub"):
+        return process_epub_file(file_path)
+    if lower.endswith(".pdf"):
+        return process_pdf_file(file_path)
+    return None
+
+
+def render_pdf_cover(file_path: str) -> Optional[str]:
+    return PDFScanner.extract_cover(file_path)
+
+
+def render_pending_covers(
+    session: Session,
+    workers: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """Render the covers PDF scans deferred, in the scan worker pool.
+
+    PDFs are ingested from their metadata alone, so they show up right away;
+    this fills in cover_path afterwards. Results are written ``batch_size``
+    at a time, each batch in one short transaction, so the database is never
+    locked while pages render. Covers that fail to render are stored as
+    NO_COVER and not retried.
+    """
+    workers = min(max(1, workers or SCAN_WORKERS), MAX_SCAN_WORKERS)
+    batch_size = max(1, batch_size or SCAN_BATCH_SIZE)
+    pending = session.exec(
+        select(Book.id, Book.file_path).where(
+            Book.file_type == "pdf", Book.cover_path.is_(None)
+        )
+    ).all()
+    stats = {"pending_covers": len(pending), "rendered_covers": 0, "errors": 0}
+    if not pending:
+        return {"status": "success", **stats}
+
+    def write(results: List[Tuple[int, Optional[str]]]):
+        for book_id, cover_path in results:
+            values = {"cover_path": cover_path or NO_COVER}
+            if cover_path:
+                values["last_updated"] = datetime.now()
+            session.exec(update(Book).where(Book.id == book_id).values(**values))
+        session.commit()
+
+    context = multiprocessing.get_context("spawn")
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+    status = "success"
+    results = []
+    try:
+        covers = pool.map(render_pdf_cover, [path for _, path in pending], chunksize=4)
+        for (book_id, _), cover_path in zip(pending, covers):
+            results.append((book_id, cover_path))
+            stats["rendered_covers" if cover_path else "errors"] += 1
+            if len(results) >= batch_size:
+                write(results)
+                results = []
+            if on_progress:
+                on_progress(dict(stats))
+            if should_stop and should_stop():
+                status = "cancelled"
+                break
+        write(results)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return {"status": status, **stats}
+
+
+def fingerprint_books(
+    session: Session,
+    batch_size: Optional[int] = None,
+    should_stop: Optional[Callable[[], bool]] = None,
+) -> int:
+    """Hash the files of books without a current content hash or digest.
+
+    That covers books scanned before these were stored, and content hashes
+    made with another algorithm (xxhash installed or removed since), which
+    would no longer match new ones. Files are hashed outside any transaction
+    and the results written ``batch_size`` at a time, so large files never
+    keep the database locked.
+    """
+    batch_size = max(1, batch_size or SCAN_BATCH_SIZE)
+    pending = session.exec(
+        select(Book.id, Book.file_path)
+        .join(ScannedFile, ScannedFile.file_path == Book.file_path)
+        .where(
+            or_(
+                Book.content_hash.is_(None),
+                Book.content_hash.not_like(f"{FILE_HASH_PREFIX}%"),
+                Book.partial_md5.is_(None),
+            ),
+            ScannedFile.missing.is_(False),
+        )
+    ).all()
+
+    def write(results: List[Tuple[int, str, str]]):
+        for book_id, content_hash, digest in results:
+            session.exec(
+                update(Book)
+                .where(Book.id == book_id)
+                .values(content_hash=content_hash, partial_md5=digest)
+            )
+        session.commit()
+
+    hashed = 0
+    results = []
+    for book_id, file_path in pending:
+        if should_stop and should_stop():
+            break
+        try:
+            results.append(
+                (book_id, BaseScanner.generate_file_hash(file_path), partial_md5(file_path))
+            )
+        except OSError as e:
+            print(f"Error hashing {file_path}: {e}")
+            continue
+        hashed += 1
+        if len(results) >= batch_size:
+            write(results)
+            results = []
+    write(results)
+    return hashed
+
+
+def is_book_file(file_path: str) -> bool:
+    return file_path.lower().endswith((".epub", ".pdf"))
+
+
+# (size, mtime_ns, inode) as reported by os.stat
+FileStat = Tuple[int, int, int]
+
+
+class ScanManifest:
+    """In-memory view of what the last scans saw under one books path.
+
+    The known books and their recorded (size, mtime_ns, inode) are loaded in
+    two queries up front, so deciding whether a file needs processing never
+    touches the database. Manifest rows are upserted in batches alongside the
+    scanned books.
+    """
+
+    def __init__(self, session: Session, books_path: str):
+        self.session = session
+        self.root = os.path.join(books_path, "")
+        self.book_ids: Dict[str, int] = {
+            file_path: book_id
+            for book_id, file_path in session.exec(select(Book.id, Book.file_path))
+        }
+        self.entries: Dict[str, Tuple[FileStat, bool]] = {
+            row.file_path: ((row.size, row.mtime_ns, row.inode), row.missing)
+            for row in session.exec(select(ScannedFile))
+        }
+        self._unseen = {
+            file_path
+            for file_path in set(self.book_ids) | set(self.entries)
+            if file_path.startswith(self.root)
+        }
+        self._pending: List[dict] = []
+
+    def needs_processing(
+        self, file_path: str, file_stat: FileStat, incremental: bool = True
+    ) -> bool:
+        """Return True for new or changed files (every file when not incremental)"""
+        self._unseen.discard(file_path)
+        book_id = self.book_ids.get(file_path)
+        if book_id is None or not incremental:
+            return True
+
+        entry = self.entries.get(file_path)
+        if entry is None:
+            # Book scanned before the manifest existed: adopt it as-is
+            self.record(file_path, file_stat, book_id)
+            return False
+
+        recorded_stat, missing = entry
+        if recorded_stat != file_stat:
+            return True
+        if missing:
+            self.record(file_path, file_stat, book_id)
+        return False
+
+    def record(self, file_path: str, file_stat: FileStat, book_id: Optional[int]):
+        self.entries[file_path] = (file_stat, False)
+        if book_id is not None:
+            self.book_ids[file_path] = book_id
+        self._pending.append(
+            {
+                "file_path": file_path,
+                "book_id": book_id,
+                "size": file_stat[0],
+                "mtime_ns": file_stat[1],
+                "inode": file_stat[2],
+                "missing": False,
+                "last_seen": datetime.now(),
+            }
+        )
+        # Books adopted from before the manifest existed can be a whole
+        # library; write them as they come rather than in one statement
+        if len(self._pending) >= MANIFEST_BATCH_SIZE:
+            self.flush()
+            self.session.commit()
+
+    def relink(self, old_path: str, new_path: str, file_stat: Optional[FileStat], book_id: int):
+        """Move a book's manifest entry to the path its file was moved to"""
+        self.book_ids.pop(old_path, None)
+        self.entries.pop(old_path, None)
+        self._unseen.discard(old_path)
+        self._pending = [row for row in self._pending if row["file_path"] != old_path]
+        self.session.exec(delete(ScannedFile).where(ScannedFile.file_path == old_path))
+        if file_stat:
+            self.record(new_path, file_stat, book_id)
+        else:
+            self.book_ids[new_path] = book_id
+
+    def flush(self):
+        """Upsert pending manifest rows, MANIFEST_BATCH_SIZE per statement; the caller commits"""
+        for start in range(0, len(self._pending), MANIFEST_BATCH_SIZE):
+            statement = insert(ScannedFile).values(
+                self._pending[start : start + MANIFEST_BATCH_SIZE]
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[ScannedFile.file_path],
+                set_={
+                    "book_id": statement.excluded.book_id,
+                    "size": statement.excluded.size,
+                    "mtime_ns": statement.excluded.mtime_ns,
+                    "inode": statement.excluded.inode,
+                    "missing": statement.excluded.missing,
+                    "last_seen": statement.excluded.last_seen,
+                },
+            )
+            self.session.exec(statement)
+        self._pending = []
+
+    @property
+    def unseen(self) -> Set[str]:
+        """Known files under the books path no scanned file has matched yet"""
+        return set(self._unseen)
+
+    def mark_missing(self, file_paths: Optional[Iterable[str]] = None) -> int:
+        """Flag file_paths, by default every known file under the books path not seen"""
+        candidates = self._unseen if file_paths is None else file_paths
+        missing_paths = [
+            file_path
+            for file_path in candidates
+            if not (file_path in self.entries and self.entries[file_path][1])
+        ]
+        for file_path in missing_paths:
+            if file_path not in self.entries:
+                self.record(file_path, (0, 0, 0), self.book_ids.get(file_path))
+        self.flush()
+
+        for start in range(0, len(missing_paths), 500):
+            chunk = missing_paths[start : start + 500]
+            self.session.exec(
+                update(ScannedFile)
+                .where(ScannedFile.file_path.in_(chunk))
+                .values(missing=True)
+            )
+        self.session.commit()
+        return len(missing_paths)
+
+
+# Columns a rescan may refresh; reading state is never overwritten
+METADATA_FIELDS = (
+    "title",
+    "author",
+    "file_type",
+    "file_size",
+    "pages",
+    "cover_path",
+    "content_hash",
+    "title_key",
+    "partial_md5",
+    "filename_md5",
+)
+
+
+class ScanEngine:
+    """Parse book files in a process pool and write them from one writer.
+
+    Parsing (EPUB/PDF reading, cover encoding) runs in worker processes; the
+    calling thread is the only one touching the database and commits books in
+    batches of ``batch_size``. At most ``workers * 4`` files are in flight so
+    memory stays bounded however many paths are fed in. When a manifest is
+    given, files it already knows are updated in place instead of inserted,
+    and a new file with the content of a book whose file is gone (a rename
+    or move) takes over that book, keeping its progress and collections.
+
+    ``on_progress`` receives the running stats after every file, and once
+    ``should_stop`` returns True no further files are submitted; results
+    already parsed are still stored.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        manifest: Optional[ScanManifest] = None,
+        on_progress: Optional[Callable[[dict], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+    ):
+        self.session = session
+        self.workers = min(max(1, workers or SCAN_WORKERS), MAX_SCAN_WORKERS)
+        self.batch_size = max(1, batch_size or SCAN_BATCH_SIZE)
+        self.manifest = manifest
+        self.on_progress = on_progress
+        self.should_stop = should_stop
+        self.cancelled = False
+        self.processed_files = 0
+        self.new_books = 0
+        self.updated_books = 0
+        self.relinked_books = 0
+        self.errors = 0
+        self.started_at = None
+        self.finished_at = None
+        self._batch: List[Tuple[dict, Optional[FileStat]]] = []
+        self._relinked_ids = set()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    @property
+    def files_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.processed_files / elapsed if elapsed > 0 else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "processed_files": self.processed_files,
+            "new_books": self.new_books,
+            "updated_books": self.updated_books,
+            "relinked_books": self.relinked_books,
+            "errors": self.errors,
+            "workers": self.workers,
+            "elapsed_seconds": round(self.elapsed_seconds, 3),
+            "files_per_second": round(self.files_per_second, 2),
+        }
+
+    def run(self, files: Iterable[Tuple[str, Optional[FileStat]]]) -> dict:
+        """Process ``(file_path, file_stat)`` pairs and store the results"""
+        self.started_at = time.monotonic()
+        try:
+            if self.workers == 1:
+                for file_path, file_stat in files:
+                    if self._stop_requested():
+                        break
+                    self._handle_result(process_book_file(file_path), file_stat)
+            else:
+                self._run_pool(files)
+            self._flush()
+        finally:
+            self.finished_at = time.monotonic()
+        return self.stats()
+
+    def _run_pool(self, files: Iterable[Tuple[str, Optional[FileStat]]]):
+        max_in_flight = self.workers * 4
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            pending = {}
+            for file_path, file_stat in files:
+                if self._stop_requested():
+                    break
+                pending[pool.submit(process_book_file, file_path)] = file_stat
+                if len(pending) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done, pending)
+            if self.cancelled:
+                for future in pending:
+                    future.cancel()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                self._collect(done, pending)
+
+    def _collect(self, futures, pending: dict):
+        for future in futures:
+            file_stat = pending.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                book_data = future.result()
+            except Exception as e:
+                print(f"Error in scan worker: {e}")
+                book_data = None
+            self._handle_result(book_data, file_stat)
+
+    def _handle_result(self, book_data: Optional[dict], file_stat: Optional[FileStat]):
+        self.processed_files += 1
+        if not book_data:
+            self.errors += 1
+        else:
+            self._batch.append((book_data, file_stat))
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+        if self.on_progress:
+            self.on_progress(self.stats())
+
+    def _stop_requested(self) -> bool:
+        if not self.cancelled and self.should_stop and self.should_stop():
+            self.cancelled = True
+        return self.cancelled
+
+    def _flush(self):
+        if not self._batch:
+            return
+        try:
+            new_books = []
+            updated = 0
+            for book_data, file_stat in self._batch:
+                book_id = None
+                if self.manifest:
+                    book_id = self.manifest.book_ids.get(book_data["file_path"])
+                if book_id is None:
+                    new_books.append((book_data, file_stat))
+                    continue
+                self.session.exec(
+                    update(Book)
+                    .where(Book.id == book_id)
+                    .values(
+                        last_updated=datetime.now(),
+                        **{field: book_data[field] for field in METADATA_FIELDS},
+                    )
+                )
+                updated += 1
+                if file_stat:
+                    self.manifest.record(book_data["file_path"], file_stat, book_id)
+
+            relinked = 0
+            if self.manifest and new_books:
+                new_books, relinked = self._relink_moved(new_books)
+            new_books = [(Book(**book_data), file_stat) for book_data, file_stat in new_books]
+
+            self.session.add_all([book for book, _ in new_books])
+            self.session.flush()
+            if self.manifest:
+                for book, file_stat in new_books:
+                    if file_stat:
+                        self.manifest.record(book.file_path, file_stat, book.id)
+                self.manifest.flush()
+            self.session.commit()
+            self.new_books += len(new_books)
+            self.updated_books += updated
+            self.relinked_books += relinked
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error storing scanned books: {e}")
+            self.errors += len(self._batch)
+        finally:
+            self._batch = []
+
+    def _relink_moved(self, new_books: list) -> Tuple[list, int]:
+        """Point books whose file no longer exists at new files with the same content"""
+        hashes = {book_data["content_hash"] for book_data, _ in new_books}
+        hashes.discard(None)
+        if not hashes:
+            return new_books, 0
+
+        moved: Dict[str, List[Tuple[int, str]]] = {}
+        for book_id, file_path, content_hash in self.session.exec(
+            select(Book.id, Book.file_path, Book.content_hash)
+            .where(Book.content_hash.in_(hashes))
+            .order_by(Book.id)
+        ):
+            if book_id not in self._relinked_ids and not os.path.exists(file_path):
+                moved.setdefault(content_hash, []).append((book_id, file_path))
+
+        remaining = []
+        relinked = 0
+        for book_data, file_stat in new_books:
+            candidates = moved.get(book_data["content_hash"])
+            if not candidates:
+                remaining.append((book_data, file_stat))
+                continue
+            book_id, old_path = candidates.pop(0)
+            self.session.exec(
+                update(Book)
+                .where(Book.id == book_id)
+                .values(
+                    file_path=book_data["file_path"],
+                    last_updated=datetime.now(),
+                    **{field: book_data[field] for field in METADATA_FIELDS},
+                )
+            )
+            self.manifest.relink(old_path, book_data["file_path"], file_stat, book_id)
+            self._relinked_ids.add(book_id)
+            relinked += 1
+        return remaining, relinked
@@ -1,44 +1,77 @@
 import os
 import hashlib
-from PIL import Image, ImageDraw
+from functools import lru_cache
+from typing import Iterable, Iterator
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+HASH_CHUNK_SIZE = 1024 * 1024
+CONTENT_CHUNK_CHARS = int(os.getenv("LOCALREADS_CONTENT_CHUNK_CHARS", "4000"))
+
+
+# Stored hashes are prefixed with the algorithm, since which one is used
+# depends on whether the optional xxhash package is installed
+FILE_HASH_ALGORITHM = "xxh3" if xxhash is not None else "blake2b"
+FILE_HASH_PREFIX = f"{FILE_HASH_ALGORITHM}:"
+
+
+def _new_hasher():
+    """xxh3-128 when the optional xxhash package is installed, else BLAKE2b-128"""
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+@lru_cache(maxsize=4096)
+def _hash_file(file_path: str, size: int, mtime_ns: int) -> str:
+    hasher = _new_hasher()
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            hasher.update(view[:read])
+    return FILE_HASH_PREFIX + hasher.hexdigest()
+
+
+def chunk_text(pieces: Iterable[str], size: int = CONTENT_CHUNK_CHARS) -> Iterator[str]:
+    """Regroup streamed text into whitespace-normalized chunks of about size chars"""
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length < size:
+            continue
+        text = "".join(buffer)
+        while len(text) >= size:
+            cut = text.rfind(" ", 0, size)
+            if cut <= 0:
+                cut = size
+            chunk = " ".join(text[:cut].split())
+            text = text[cut:]
+            if chunk:
+                yield chunk
+        buffer = [text]
+        length = len(text)
+    chunk = " ".join("".join(buffer).split())
+    if chunk:
+        yield chunk
 
 
 class BaseScanner:
 
     @staticmethod
     def generate_file_hash(file_path: str) -> str:
-        with open(file_path, "rb") as f:
-            file_hash = hashlib.md5(f.read()).hexdigest()
-        return file_hash
+        """Hash the file as "<algorithm>:<hex digest>", memoized per (path, size, mtime)"""
+        file_stat = os.stat(file_path)
+        return _hash_file(file_path, file_stat.st_size, file_stat.st_mtime_ns)
 
     @staticmethod
     def get_file_size(file_path: str) -> int:
         return os.path.getsize(file_path)
-
-    @staticmethod
-    def create_placeholder_cover(title: str, cover_path: str):
-        """Create a simple placeholder cover for books without covers"""
-
-        img = Image.new("RGB", (200, 300), color=(240, 240, 240))
-        d = ImageDraw.Draw(img)
-
-        title_lines = []
-        words = title.split()
-        current_line = ""
-        for word in words:
-            test_line = current_line + " " + word if current_line else word
-            if len(test_line) > 20:
-                title_lines.append(current_line)
-                current_line = word
-            else:
-                current_line = test_line
-        if current_line:
-            title_lines.append(current_line)
-
-        y_position = 100
-        for line in title_lines[:3]:
-            d.text((10, y_position), line, fill=(0, 0, 0))
-            y_position += 30
-
-        img.save(cover_path, "JPEG")
-        return cover_path
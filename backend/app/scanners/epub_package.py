@@ -0,0 +1,101 @@
+import posixpath
+import zipfile
+from typing import List, NamedTuple, Optional
+from urllib.parse import unquote
+import xml.etree.ElementTree as ET
+
+
+class ManifestItem(NamedTuple):
+    id: str
+    path: str
+    media_type: str
+    properties: str
+
+
+def _local_name(tag) -> str:
+    if not isinstance(tag, str):
+        return ""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _text(elem) -> Optional[str]:
+    text = "".join(elem.itertext()).strip()
+    return text or None
+
+
+class EPUBPackage:
+    """The parts of an EPUB's OPF package document the scanners need.
+
+    container.xml and the OPF are each parsed exactly once with the
+    expat-backed ElementTree parser, from an already open ZipFile; nothing
+    else in the archive is read. Manifest, spine and guide hrefs are resolved
+    to paths inside the archive.
+    """
+
+    def __init__(self, opf_path: str):
+        self.opf_path = opf_path
+        self.title: Optional[str] = None
+        self.creator: Optional[str] = None
+        self.cover_id: Optional[str] = None
+        self.manifest: List[ManifestItem] = []
+        self.spine: List[str] = []
+        self.guide: List[tuple] = []
+
+    @classmethod
+    def read(cls, zf: zipfile.ZipFile) -> Optional["EPUBPackage"]:
+        """Parse container.xml and the OPF it points to, or return None"""
+        try:
+            container = ET.fromstring(zf.read("META-INF/container.xml"))
+            opf_path = None
+            for elem in container.iter():
+                if _local_name(elem.tag) == "rootfile" and elem.get("full-path"):
+                    opf_path = elem.get("full-path")
+                    break
+            if not opf_path:
+                return None
+
+            package = cls(opf_path)
+            package._parse_opf(ET.fromstring(zf.read(opf_path)))
+            return package
+        except (KeyError, ET.ParseError) as e:
+            print(f"Error parsing content.opf: {e}")
+            return None
+
+    def resolve(self, href: str, base_path: Optional[str] = None) -> str:
+        """Turn an href relative to base_path (default: the OPF) into a ZIP path"""
+        base_dir = posixpath.dirname(base_path if base_path is not None else self.opf_path)
+        href = unquote(href.split("#", 1)[0])
+        return posixpath.normpath(posixpath.join(base_dir, href))
+
+    def item_by_id(self, item_id: str) -> Optional[ManifestItem]:
+        for item in self.manifest:
+            if item.id == item_id:
+                return item
+        return None
+
+    def spine_items(self) -> List[ManifestItem]:
+        items = [self.item_by_id(idref) for idref in self.spine]
+        return [item for item in items if item is not None]
+
+    def _parse_opf(self, root):
+        for elem in root.iter():
+            tag = _local_name(elem.tag)
+            if tag == "title" and self.title is None:
+                self.title = _text(elem)
+            elif tag == "creator" and self.creator is None:
+                self.creator = _text(elem)
+            elif tag == "meta" and elem.get("name") == "cover":
+                self.cover_id = elem.get("content")
+            elif tag == "item" and elem.get("href"):
+                self.manifest.append(
+                    ManifestItem(
+                        id=elem.get("id", ""),
+                        path=self.resolve(elem.get("href")),
+                        media_type=elem.get("media-type", ""),
+                        properties=elem.get("properties", ""),
+                    )
+                )
+            elif tag == "itemref" and elem.get("idref"):
+                self.spine.append(elem.get("idref"))
+            elif tag == "reference" and elem.get("href"):
+                self.guide.append((elem.get("type", ""), self.resolve(elem.get("href"))))
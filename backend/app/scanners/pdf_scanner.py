@@ -1,29 +1,61 @@
 import os
-from typing import Dict, Optional
-from .base_scanner import BaseScanner
+from typing import Dict, Iterator, Optional, Tuple
+from .base_scanner import BaseScanner, chunk_text
+from ..covers import COVER_SIZES, cover_content_hash, store_cover
+from PIL import Image
 import pymupdf
 
 
 class PDFScanner(BaseScanner):
     @classmethod
-    def extract_metadata(cls, file_path: str) -> Dict:
-        """Extract metadata from PDF file"""
+    def render_cover(cls, doc, file_path: str) -> str:
+        """Render the first page just large enough for the biggest cover size"""
+        page = doc.load_page(0)
+        max_width, max_height = max(COVER_SIZES.values())
+        scale = min(max_width / page.rect.width, max_height / page.rect.height, 2.0)
+        pix = page.get_pixmap(matrix=pymupdf.Matrix(scale, scale), alpha=False)
+        samples = pix.samples
+        return store_cover(
+            cover_content_hash(samples),
+            lambda: Image.frombytes("RGB", (pix.width, pix.height), samples),
+        )
+
+    @classmethod
+    def extract_cover(cls, file_path: str) -> Optional[str]:
+        """Render and store the cover of a PDF, deferred from the metadata scan"""
         try:
-            doc = pymupdf.open(file_path)
-            metadata = {
-                "title": os.path.splitext(os.path.basename(file_path))[0],
-                "author": "-",
-                "pages": len(doc),
-                "cover_path": None,
-            }
+            with pymupdf.open(file_path) as doc:
+                return cls.render_cover(doc, file_path)
+        except Exception as e:
+            print(f"Error rendering cover for {file_path}: {e}")
+            return None
+
+    @classmethod
+    def iter_text(cls, file_path: str) -> Iterator[Tuple[int, str]]:
+        """Yield (page number, text chunk) pairs, loading one page at a time"""
+        with pymupdf.open(file_path) as doc:
+            for page in doc:
+                for chunk in chunk_text([page.get_text()]):
+                    yield page.number + 1, chunk
 
-            page = doc.load_page(0)
-            pix = page.get_pixmap(matrix=pymupdf.Matrix(0.7, 0.7))
-            cover_filename = f"cover_{cls.generate_file_hash(file_path)}.jpg"
-            pix.save(os.path.join("covers", cover_filename))
-            metadata["cover_path"] = os.path.join("covers", cover_filename)
+    @classmethod
+    def extract_metadata(cls, file_path: str) -> Dict:
+        """Extract metadata from PDF file without rendering any page.
 
-            return metadata
+        Only the page count and the document Info dictionary are read; the
+        cover is left to extract_cover.
+        """
+        try:
+            with pymupdf.open(file_path) as doc:
+                info = doc.metadata or {}
+                title = (info.get("title") or "").strip()
+                author = (info.get("author") or "").strip()
+                return {
+                    "title": title or os.path.splitext(os.path.basename(file_path))[0],
+                    "author": author or "Unknown Author",
+                    "pages": doc.page_count,
+                    "cover_path": None,
+                }
 
         except Exception as e:
             print(f"Error extracting metadata from PDF: {e}")
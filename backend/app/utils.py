@@ -1,30 +1,159 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 import requests as req
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import bs4
 
+OPENLIBRARY_URL = os.getenv("LOCALREADS_OPENLIBRARY_URL", "https://openlibrary.org").rstrip("/")
+OPENLIBRARY_COVERS_URL = os.getenv(
+    "LOCALREADS_OPENLIBRARY_COVERS_URL", "http://covers.openlibrary.org"
+).rstrip("/")
+
+# (connect, read) seconds per attempt
+HTTP_TIMEOUT = (3.05, float(os.getenv("LOCALREADS_HTTP_TIMEOUT", "10")))
+HTTP_RETRIES = int(os.getenv("LOCALREADS_HTTP_RETRIES", "3"))
+HTTP_POOL_SIZE = int(os.getenv("LOCALREADS_HTTP_POOL_SIZE", "16"))
+AUTHOR_FETCH_WORKERS = 4
+
+HTTP_CACHE_PATH = os.getenv("LOCALREADS_HTTP_CACHE_PATH", "./http-cache.db")
+HTTP_CACHE_TTL = int(os.getenv("LOCALREADS_HTTP_CACHE_TTL", str(30 * 24 * 3600)))
+# Misses are remembered for less time: the record may be added upstream
+HTTP_CACHE_MISS_TTL = int(os.getenv("LOCALREADS_HTTP_CACHE_MISS_TTL", str(24 * 3600)))
+
+
+def _build_session() -> req.Session:
+    """Session whose pooled connections are reused across lookups and threads"""
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry
+    )
+    session = req.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "Localreads"
+    return session
+
+
+http_session = _build_session()
+
+
+class JSONCache:
+    """Persistent URL -> JSON cache with a time-to-live, backed by SQLite.
+
+    A body of None records that the URL was not found. Safe to share between
+    threads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS http_cache "
+                "(url TEXT PRIMARY KEY, body TEXT, fetched_at REAL NOT NULL)"
+            )
+        return self._connection
+
+    def get(self, url: str):
+        """Return (hit, data); data is None for a cached miss"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT body, fetched_at FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return False, None
+        body, fetched_at = row
+        ttl = HTTP_CACHE_TTL if body is not None else HTTP_CACHE_MISS_TTL
+        if time.time() - fetched_at > ttl:
+            return False, None
+        return True, json.loads(body) if body is not None else None
+
+    def set(self, url: str, data: Optional[dict]):
+        body = json.dumps(data) if data is not None else None
+        with self._lock:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO http_cache (url, body, fetched_at) VALUES (?, ?, ?)",
+                (url, body, time.time()),
+            )
+            connection.commit()
+
+
+http_cache = JSONCache(HTTP_CACHE_PATH)
+_author_pool = ThreadPoolExecutor(max_workers=AUTHOR_FETCH_WORKERS, thread_name_prefix="openlibrary")
+
+
+def fetch_json(url: str) -> Optional[dict]:
+    """GET a JSON document through the cache; None when missing or unreachable"""
+    hit, data = http_cache.get(url)
+    if hit:
+        return data
+
+    try:
+        response = http_session.get(url, timeout=HTTP_TIMEOUT)
+    except req.RequestException as e:
+        print(f"Error fetching {url}: {e}")
+        return None
+    if response.status_code == 404:
+        http_cache.set(url, None)
+        return None
+    if response.status_code != 200:
+        print(f"Error fetching {url}: HTTP {response.status_code}")
+        return None
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        # Not cached: an HTML error page or truncated body is usually transient
+        print(f"Error decoding {url}: {e}")
+        return None
+    http_cache.set(url, data)
+    return data
+
+
+def _fetch_author_name(author_key: str) -> Optional[str]:
+    author_info = fetch_json(f"{OPENLIBRARY_URL}{author_key}.json")
+    if author_info is None:
+        return None
+    return author_info.get("name", "Unknown Author")
+
 
 def fetch_metadata_from_isbn(isbn: str) -> Optional[dict]:
-    """Fetch book metadata from openlibrary.org using ISBN"""
+    """Fetch book metadata from openlibrary.org using ISBN.
 
-    base_data = req.get(f"https://openlibrary.org/isbn/{isbn}.json")
-    if base_data.status_code != 200:
+    The edition and its authors are cached on disk; authors missing from the
+    cache are fetched concurrently.
+    """
+    data = fetch_json(f"{OPENLIBRARY_URL}/isbn/{isbn}.json")
+    if data is None:
         return None
 
-    data = base_data.json()
     title = data.get("title", "Unknown Title")
-    authors = data.get("authors", [])
-    author_names = []
-    for author in authors:
-        author_key = author.get("key")
-        if author_key:
-            author_data = req.get(f"https://openlibrary.org{author_key}.json")
-            if author_data.status_code == 200:
-                author_info = author_data.json()
-                author_names.append(author_info.get("name", "Unknown Author"))
+    author_keys = [author.get("key") for author in data.get("authors", []) if author.get("key")]
+    author_names = [
+        name for name in _author_pool.map(_fetch_author_name, author_keys) if name
+    ]
 
     return {
         "title": title,
         "author": ", ".join(author_names) if author_names else "Unknown Author",
         "pages": data.get("number_of_pages"),
-        "cover_url": f"http://covers.openlibrary.org/b/isbn/{isbn}-L.jpg",
+        "cover_url": f"{OPENLIBRARY_COVERS_URL}/b/isbn/{isbn}-L.jpg",
     }
@@ -0,0 +1,117 @@
+import os
+import stat
+from fnmatch import fnmatchcase
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+DEFAULT_INCLUDE = ("*.epub", "*.pdf")
+
+
+def _matches(name: str, rel_path: str, patterns: Sequence[str]) -> bool:
+    name = name.lower()
+    rel_path = rel_path.lower()
+    return any(
+        fnmatchcase(name, pattern) or fnmatchcase(rel_path, pattern)
+        for pattern in patterns
+    )
+
+
+def walk_files(
+    root: str,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    recursive: bool = True,
+    follow_symlinks: bool = True,
+    skipped: Optional[List[str]] = None,
+) -> Iterator[Tuple[str, os.stat_result]]:
+    """Lazily yield (file_path, stat) for regular files under root.
+
+    Built on os.scandir so directory listings come with file types for free,
+    and each file is stat'ed exactly once; the stat result is handed to the
+    caller instead of being looked up again. Patterns are case-insensitive
+    globs matched against the entry name or its path relative to root
+    (``/`` separated); excluded directories are not descended into.
+    Directories are tracked by (device, inode) so symlink loops are visited
+    once. Only pending directory paths are kept in memory, never a listing of
+    the whole tree. Directories and entries that could not be read are
+    appended to ``skipped`` when a list is given.
+    """
+    include = [pattern.lower() for pattern in (include or DEFAULT_INCLUDE)]
+    exclude = [pattern.lower() for pattern in (exclude or ())]
+
+    try:
+        root_stat = os.stat(root)
+    except OSError as e:
+        raise FileNotFoundError(f"Books path not accessible: {root}") from e
+
+    visited = {(root_stat.st_dev, root_stat.st_ino)}
+    pending = [(root, "")]
+    while pending:
+        directory, rel_dir = pending.pop()
+        try:
+            with os.scandir(directory) as entries:
+                subdirectories = []
+                for entry in entries:
+                    rel_path = f"{rel_dir}{entry.name}"
+                    if exclude and _matches(entry.name, rel_path, exclude):
+                        continue
+
+                    try:
+                        if entry.is_dir(follow_symlinks=follow_symlinks):
+                            if recursive:
+                                subdirectories.append((entry, rel_path))
+                            continue
+                        if not _matches(entry.name, rel_path, include):
+                            continue
+                        entry_stat = entry.stat(follow_symlinks=follow_symlinks)
+                    except OSError as e:
+                        print(f"Error reading {entry.path}: {e}")
+                        if skipped is not None:
+                            skipped.append(entry.path)
+                        continue
+
+                    if stat.S_ISREG(entry_stat.st_mode):
+                        yield entry.path, entry_stat
+        except OSError as e:
+            print(f"Error listing {directory}: {e}")
+            if skipped is not None:
+                skipped.append(directory)
+            continue
+
+        for entry, rel_path in reversed(subdirectories):
+            try:
+                dir_stat = entry.stat(follow_symlinks=follow_symlinks)
+            except OSError:
+                if skipped is not None:
+                    skipped.append(entry.path)
+                continue
+            key = (dir_stat.st_dev, dir_stat.st_ino)
+            if key in visited:
+                continue
+            visited.add(key)
+            pending.append((entry.path, f"{rel_path}/"))
+
+
+def walk_includes(
+    root: str,
+    file_path: str,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    recursive: bool = True,
+) -> bool:
+    """Whether walk_files(root, ...) with these options would visit file_path.
+
+    Decided from the path alone, so a file that is gone can be told apart
+    from one the walk was never going to list.
+    """
+    include = [pattern.lower() for pattern in (include or DEFAULT_INCLUDE)]
+    exclude = [pattern.lower() for pattern in (exclude or ())]
+    rel_path = os.path.relpath(file_path, root)
+    if rel_path == os.curdir or rel_path.split(os.sep)[0] == os.pardir:
+        return False
+    parts = rel_path.split(os.sep)
+    if not recursive and len(parts) > 1:
+        return False
+    for depth, name in enumerate(parts, 1):
+        if exclude and _matches(name, "/".join(parts[:depth]), exclude):
+            return False
+    return _matches(parts[-1], "/".join(parts), include)
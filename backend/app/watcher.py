@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+import traceback
+from typing import Dict, Optional, Set, Tuple
+from sqlmodel import Session
+from .content_index import CONTENT_INDEXING
+from .db import engine
+from .jobs import submit_content_job, submit_cover_job
+from .scan_engine import ScanEngine, ScanManifest, is_book_file
+from .walker import walk_files
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+
+WATCH_PATH = os.getenv("LOCALREADS_WATCH_PATH")
+WATCH_DEBOUNCE_SECONDS = float(os.getenv("LOCALREADS_WATCH_DEBOUNCE", "2"))
+WATCH_POLL_SECONDS = float(os.getenv("LOCALREADS_WATCH_POLL_INTERVAL", "10"))
+WATCH_FORCE_POLLING = os.getenv("LOCALREADS_WATCH_POLLING", "").lower() in ("1", "true", "yes")
+
+
+def _file_key(file_path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "LibraryWatcher"):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.event_type in ("opened", "closed_no_write"):
+            return
+        # A directory is "modified" whenever an entry in it changes; those
+        # entries raise their own events
+        if event.is_directory and event.event_type not in ("created", "deleted", "moved"):
+            return
+        if event.event_type == "moved":
+            self.watcher.notify(event.src_path, event.is_directory)
+            self.watcher.notify(event.dest_path, event.is_directory)
+        else:
+            self.watcher.notify(event.src_path, event.is_directory)
+
+
+class LibraryWatcher:
+    """Ingest book files under books_path shortly after they change.
+
+    Uses inotify (or the platform's equivalent) through the optional watchdog
+    package, and otherwise polls the tree's file stats every
+    ``poll_interval`` seconds; nothing is parsed to find changes either way.
+    A changed path is processed once it has seen no event for
+    ``debounce`` seconds and its size and mtime stayed the same over that
+    time, so files still being copied are left alone. Settled files go
+    through the scan engine with the library manifest: new and modified
+    files are (re)parsed, a moved file is re-linked to its book, and
+    deleted files are flagged missing.
+    """
+
+    def __init__(
+        self,
+        books_path: str,
+        debounce: float = WATCH_DEBOUNCE_SECONDS,
+        poll_interval: float = WATCH_POLL_SECONDS,
+        force_polling: bool = WATCH_FORCE_POLLING,
+    ):
+        self.books_path = books_path
+        self.root = os.path.abspath(books_path)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.polling = force_polling or Observer is None
+        self.stats = dict.fromkeys(
+            ("processed_files", "new_books", "updated_books", "relinked_books", "errors"), 0
+        )
+        self.stats["missing_files"] = 0
+        # path -> (deadline, file key when last seen changing)
+        self._pending: Dict[str, Tuple[float, Optional[Tuple[int, int, int]]]] = {}
+        self._removed_directories: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._observer = None
+        self._snapshot: Dict[str, Tuple[int, int, int]] = {}
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop_event.clear()
+        if self.polling:
+            self._snapshot = self._take_snapshot()
+            self._spawn(self._poll_loop, "watch-poll")
+        else:
+            self._observer = Observer()
+            self._observer.schedule(_EventHandler(self), self.root, recursive=True)
+            self._observer.start()
+        self._spawn(self._settle_loop, "watch-settle")
+        print(f"Watching {self.books_path} ({'polling' if self.polling else 'events'})")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def notify(self, path: str, is_directory: bool = False):
+        """Record a change to path (absolute or under books_path)"""
+        path = self._library_path(path)
+        if path is None:
+            return
+        if is_directory:
+            if os.path.isdir(path):
+                # Files inside a directory moved in raise no events of their own
+                for file_path, _ in walk_files(path):
+                    self._touch(file_path)
+            else:
+                with self._lock:
+                    self._removed_directories.add(os.path.join(path, ""))
+                    self._pending.setdefault(path, (0, None))
+        elif is_book_file(path):
+            self._touch(path)
+
+    def _touch(self, file_path: str):
+        with self._lock:
+            self._pending[file_path] = (time.monotonic() + self.debounce, _file_key(file_path))
+
+    def _library_path(self, path: str) -> Optional[str]:
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        if relative == os.pardir or relative.startswith(os.pardir + os.sep):
+            return None
+        # Joined like walk_files joins them, so paths match those scans stored
+        return os.path.join(self.books_path, relative)
+
+    def _spawn(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int, int]]:
+        return {
+            file_path: (file_stat.st_size, file_stat.st_mtime_ns, file_stat.st_ino)
+            for file_path, file_stat in walk_files(self.books_path)
+        }
+
+    def _poll_loop(self):
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                snapshot = self._take_snapshot()
+            except FileNotFoundError as e:
+                print(f"Watcher: {e}")
+                continue
+            for file_path in snapshot.keys() | self._snapshot.keys():
+                if snapshot.get(file_path) != self._snapshot.get(file_path):
+                    self._touch(file_path)
+            self._snapshot = snapshot
+
+    def _settle_loop(self):
+        while not self._stop_event.wait(min(0.5, self.debounce or 0.5)):
+            try:
+                self._process(self._settled())
+            except Exception:
+                traceback.print_exc()
+
+    def _settled(self) -> Dict[str, Optional[Tuple[int, int, int]]]:
+        """Take the paths whose events and file size/mtime have gone quiet"""
+        now = time.monotonic()
+        settled = {}
+        with self._lock:
+            for file_path, (deadline, key) in list(self._pending.items()):
+                if deadline > now:
+                    continue
+                current = _file_key(file_path)
+                if current != key:
+                    self._pending[file_path] = (now + self.debounce, current)
+                    continue
+                settled[file_path] = current
+                del self._pending[file_path]
+        return settled
+
+    def _process(self, settled: Dict[str, Optional[Tuple[int, int, int]]]):
+        if not settled:
+            return
+        with self._lock:
+            removed_directories, self._removed_directories = self._removed_directories, set()
+
+        with Session(engine) as session:
+            manifest = ScanManifest(session, self.books_path)
+            changed = [
+                (file_path, key)
+                for file_path, key in sorted(settled.items())
+                if key is not None and manifest.needs_processing(file_path, key)
+            ]
+            scan = ScanEngine(session, workers=1, manifest=manifest)
+            result = scan.run(changed)
+
+            # After the engine ran, moved files have been re-linked already
+            gone = {file_path for file_path, key in settled.items() if key is None}
+            gone.update(
+                file_path
+                for file_path in manifest.book_ids
+                if file_path.startswith(tuple(removed_directories))
+                and not os.path.exists(file_path)
+            )
+            missing = manifest.mark_missing(
+                file_path for file_path in gone if file_path in manifest.book_ids
+            )
+
+        with self._lock:
+            for field in result.keys() & self.stats.keys():
+                self.stats[field] += result[field]
+            self.stats["missing_files"] += missing
+        if result["new_books"] or result["updated_books"] or result["relinked_books"]:
+            submit_cover_job(workers=1)
+            if CONTENT_INDEXING:
+                submit_content_job()
+
+
+library_watcher = LibraryWatcher(WATCH_PATH) if WATCH_PATH else None
@@ -0,0 +1,148 @@
+"""Concurrent read/write throughput of the old and the current engine settings.
+
+Eight writer threads update reading progress through update_book_progress
+while eight reader threads page through the library and open single books,
+for a few seconds per profile, each profile on its own copy of the same
+library:
+
+- old: the engine as it used to be built, echo on (logged to a file) and
+  SQLite's default rollback journal and pragmas
+- current: the engine settings from app.db (WAL, synchronous, cache, mmap,
+  busy_timeout, pooling, echo off)
+
+Run from backend/: python -m bench.concurrency [--seconds 5] [--books 2000]
+"""
+
+import argparse
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+WORKDIR = tempfile.mkdtemp(prefix="localreads-bench-")
+# app.db and app.utils open their databases on import
+os.environ.setdefault("LOCALREADS_DATABASE_URL", f"sqlite:///{WORKDIR}/app.db")
+os.environ.setdefault("LOCALREADS_HTTP_CACHE_PATH", os.path.join(WORKDIR, "http-cache.db"))
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.dialects.sqlite import insert  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine  # noqa: E402
+from app.crud import get_book_by_id, get_books_page, update_book_progress  # noqa: E402
+from app.db import DB_MAX_OVERFLOW, DB_POOL_SIZE, SQL_ECHO, SQLITE_PRAGMAS  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.models import Book  # noqa: E402
+
+WRITERS = 8
+READERS = 8
+
+
+def old_engine(url: str):
+    # As db.py used to build it; check_same_thread is off only so the
+    # benchmark's threads can share the pool
+    engine = create_engine(url, echo=True, connect_args={"check_same_thread": False})
+    log_path = os.path.join(WORKDIR, "echo.log")
+    for handler in logging.getLogger("sqlalchemy.engine.Engine").handlers:
+        handler.setStream(open(log_path, "a"))
+    return engine
+
+
+def current_engine(url: str):
+    engine = create_engine(
+        url,
+        echo=SQL_ECHO,
+        connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return engine
+
+
+def populate(engine, books: int):
+    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    rows = [
+        Book(
+            title=f"Book {index:05d}",
+            author=f"Author {index % 97}",
+            file_path=f"/bench/{index:05d}.epub",
+            file_type="epub",
+            file_size=1,
+        ).model_dump(exclude={"id"})
+        for index in range(books)
+    ]
+    with Session(engine) as session:
+        for start in range(0, len(rows), 500):
+            session.exec(insert(Book).values(rows[start : start + 500]))
+        session.commit()
+
+
+def run(engine, books: int, seconds: float) -> dict:
+    stats = {"writes": 0, "reads": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def count(kind: str):
+        with lock:
+            stats[kind] += 1
+
+    def writer():
+        while time.monotonic() < deadline:
+            try:
+                with Session(engine) as session:
+                    update_book_progress(
+                        session, random.randint(1, books), {"progress": random.random()}
+                    )
+                count("writes")
+            except Exception:
+                count("errors")
+
+    def reader():
+        while time.monotonic() < deadline:
+            try:
+                with Session(engine) as session:
+                    get_books_page(session, "title", limit=50)
+                    get_book_by_id(session, random.randint(1, books))
+                count("reads")
+            except Exception:
+                count("errors")
+
+    threads = [threading.Thread(target=writer) for _ in range(WRITERS)]
+    threads += [threading.Thread(target=reader) for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--books", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{WRITERS} writers, {READERS} readers, {args.books} books, {args.seconds:g}s each")
+    for name, make_engine in (("old", old_engine), ("current", current_engine)):
+        engine = make_engine(f"sqlite:///{WORKDIR}/{name}.db")
+        populate(engine, args.books)
+        stats = run(engine, args.books, args.seconds)
+        engine.dispose()
+        print(
+            f"{name:>8}: {stats['writes'] / args.seconds:8.1f} writes/s "
+            f"{stats['reads'] / args.seconds:8.1f} reads/s "
+            f"{stats['errors']:6d} errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Run the app against a temporary database and working directory.
+
+The engine is created from LOCALREADS_DATABASE_URL when app.db is first
+imported, so every test module shares the one app set up here.
+"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def workdir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("localreads")
+    previous_cwd = os.getcwd()
+    os.chdir(path)
+    os.environ["LOCALREADS_DATABASE_URL"] = f"sqlite:///{path / 'test.db'}"
+    os.environ["LOCALREADS_HTTP_CACHE_PATH"] = str(path / "http-cache.db")
+    yield path
+    os.chdir(previous_cwd)
+
+
+@pytest.fixture(scope="session")
+def client(workdir):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def engine(client):
+    from app.db import engine
+
+    return engine
@@ -0,0 +1,90 @@
+"""Replay recorded KOReader progress sync traffic against the kosync endpoints.
+
+kosync_traffic.json holds the requests a KOReader device sends (register,
+authorize, push and pull progress) with the responses it expects, using
+both document digest modes: the partial MD5 of dune.epub and the file name
+MD5 of manual.pdf. "<timestamp>" stands for any integer timestamp.
+
+Run from backend/: python -m pytest tests
+"""
+
+import json
+import os
+
+import pytest
+
+TRAFFIC_PATH = os.path.join(os.path.dirname(__file__), "kosync_traffic.json")
+
+
+def _pattern(size: int) -> bytes:
+    return bytes(i % 251 for i in range(size))
+
+
+def _matches(expected, actual) -> bool:
+    if expected == "<timestamp>":
+        return isinstance(actual, int)
+    if isinstance(expected, dict):
+        return (
+            isinstance(actual, dict)
+            and expected.keys() == actual.keys()
+            and all(_matches(value, actual[key]) for key, value in expected.items())
+        )
+    return expected == actual
+
+
+@pytest.fixture(scope="module")
+def traffic():
+    with open(TRAFFIC_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def library(client, engine, workdir, traffic):
+    from sqlmodel import Session
+    from app.fingerprint import filename_md5, partial_md5
+    from app.models import Book
+
+    library = workdir / "kosync-books"
+    library.mkdir()
+    with Session(engine) as session:
+        for name, spec in traffic["library"].items():
+            file_path = str(library / name)
+            with open(file_path, "wb") as f:
+                f.write(_pattern(spec["pattern_bytes"]))
+            session.add(
+                Book(
+                    title=name,
+                    file_path=file_path,
+                    file_type=name.rsplit(".", 1)[1],
+                    file_size=spec["pattern_bytes"],
+                    partial_md5=partial_md5(file_path),
+                    filename_md5=filename_md5(file_path),
+                )
+            )
+        session.commit()
+    return library
+
+
+def test_replay(client, library, traffic):
+    for index, exchange in enumerate(traffic["exchanges"]):
+        request = exchange["request"]
+        response = client.request(
+            request["method"],
+            request["path"],
+            headers=request.get("headers"),
+            json=request.get("json"),
+        )
+        expected = exchange["response"]
+        assert response.status_code == expected["status"], (index, response.text)
+        assert _matches(expected["json"], response.json()), (index, response.json())
+
+
+def test_books_updated(client, library, traffic):
+    books = {
+        os.path.basename(book["file_path"]): book
+        for book in client.get("/books/").json()
+        if book["file_path"].startswith(str(library))
+    }
+    for name, fields in traffic["expected_books"].items():
+        for field, value in fields.items():
+            assert books[name][field] == value, (name, field)
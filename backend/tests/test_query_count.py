@@ -0,0 +1,86 @@
+"""Book listings load collection membership in a constant number of queries.
+
+Counts the statements the engine runs per request with a
+before_cursor_execute listener, at 10 books and again at 300.
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+SIZES = (10, 300)
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _add_books(engine, collection_ids, start: int, stop: int) -> int:
+    from sqlmodel import Session
+    from app.models import Book, BookCollection
+
+    with Session(engine) as session:
+        books = [
+            Book(
+                title=f"Query count {index:04d}",
+                file_path=f"/query-count/{index:04d}.epub",
+                file_type="epub",
+                file_size=1,
+            )
+            for index in range(start, stop)
+        ]
+        session.add_all(books)
+        session.flush()
+        session.add_all(
+            BookCollection(book_id=book.id, collection_id=collection_id)
+            for book in books
+            for collection_id in collection_ids
+        )
+        session.commit()
+        return books[0].id
+
+
+@pytest.fixture(scope="module")
+def query_counts(client, engine):
+    from app.response_cache import response_cache
+
+    collection_ids = [
+        client.post("/collections/", json={"name": name, "description": ""}).json()["id"]
+        for name in ("Query count A", "Query count B")
+    ]
+    counts = {}
+    added = 0
+    for size in SIZES:
+        book_id = _add_books(engine, collection_ids, added, size)
+        added = size
+        requests = {
+            "books": "/books/",
+            "book": f"/books/{book_id}",
+            "collection_books": f"/collections/{collection_ids[0]}/books",
+        }
+        counts[size] = {}
+        for name, path in requests.items():
+            # Measure the database, not the response cache
+            response_cache.invalidate()
+            with count_queries(engine) as statements:
+                response = client.get(path)
+            assert response.status_code == 200
+            counts[size][name] = len(statements)
+    return counts
+
+
+@pytest.mark.parametrize("request_name", ["books", "book", "collection_books"])
+def test_query_count_is_flat(query_counts, request_name):
+    small, large = (query_counts[size][request_name] for size in SIZES)
+    assert small == large, query_counts
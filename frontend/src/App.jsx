@@ -7,6 +7,8 @@ import ConfirmDialog from './components/ConfirmDialog';
 import './App.css';
 import { API_BASE_URL } from './config';
 
+const BOOKS_PAGE_SIZE = 200;
+
 function App() {
     const [books, setBooks] = useState([]);
     const [collections, setCollections] = useState([]);
@@ -48,18 +50,28 @@ function App() {
     const fetchBooks = async () => {
         try {
             setLoading(true);
-            let url = `${API_BASE_URL}/books/`;
 
             if (selectedCollection && selectedCollection !== 'hidden') {
-                url = `${API_BASE_URL}/collections/${selectedCollection}/books`;
+                const response = await fetch(`${API_BASE_URL}/collections/${selectedCollection}/books`);
+                if (response.ok) {
+                    setBooks(await response.json());
+                }
+                return;
             }
 
-            const response = await fetch(url);
-            if (response.ok) {
-                const data = await response.json();
-                console.log('Fetched books:', data);
-                setBooks(data);
-            }
+            // Page through the library so the grid fills in as pages arrive
+            let cursor = null;
+            let loaded = [];
+            do {
+                const params = new URLSearchParams({ limit: BOOKS_PAGE_SIZE });
+                if (cursor) params.set('cursor', cursor);
+                const response = await fetch(`${API_BASE_URL}/books/?${params}`);
+                if (!response.ok) break;
+                loaded = loaded.concat(await response.json());
+                setBooks(loaded);
+                setLoading(false);
+                cursor = response.headers.get('X-Next-Cursor');
+            } while (cursor);
         } catch (error) {
             console.error('Error fetching books:', error);
         } finally {
@@ -202,8 +214,14 @@ function App() {
         try {
             const response = await fetch(`${API_BASE_URL}/scan/`, { method: 'POST' });
             if (response.ok) {
-                const result = await response.json();
-                setScanResult(result);
+                let job = await response.json();
+                while (job.status === 'pending' || job.status === 'running') {
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                    const jobResponse = await fetch(`${API_BASE_URL}/scan/${job.id}`);
+                    if (!jobResponse.ok) break;
+                    job = await jobResponse.json();
+                }
+                setScanResult(job.result || { status: 'error', message: job.error || 'Scan failed.' });
                 fetchBooks();
             }
         } catch (error) {
@@ -1,7 +1,7 @@
 import React, { useState, useRef } from 'react';
 import StarRating from './StarRating';
 import BookContextMenu from './BookContextMenu';
-import { API_BASE_URL } from '../config';
+import { getCoverUrl, getCoverSrcSet } from '../config';
 
 const BookCard = ({ book, onClick, onRemove, onAddToCollection }) => {
     const [contextMenu, setContextMenu] = useState(null);
@@ -98,17 +98,8 @@ const BookCard = ({ book, onClick, onRemove, onAddToCollection }) => {
         }, 300);
     };
 
-    const getCoverImageSrc = () => {
-        if (!book.cover_path) return null;
-
-        if (book.file_path && book.file_path.startsWith('ISBN')) {
-            return book.cover_path;
-        }
-
-        return `${API_BASE_URL}/${book.cover_path}`
-    }
-
-    const coverImageSrc = getCoverImageSrc();
+    const coverImageSrc = getCoverUrl(book, 'grid');
+    const coverImageSrcSet = getCoverSrcSet(book, 'grid');
 
     return (
         <>
@@ -127,6 +118,7 @@ const BookCard = ({ book, onClick, onRemove, onAddToCollection }) => {
                             {coverImageSrc ? (
                                 <img
                                     src={coverImageSrc}
+                                    srcSet={coverImageSrcSet}
                                     alt={book.title}
                                     className="w-full h-full object-cover"
                                 />
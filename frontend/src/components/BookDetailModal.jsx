@@ -1,5 +1,5 @@
 import React, { useState } from 'react';
-import { API_BASE_URL } from '../config';
+import { getCoverUrl, getCoverSrcSet } from '../config';
 import StarRating from './StarRating';
 
 const BookDetailModal = ({ book, onClose, onUpdate }) => {
@@ -43,17 +43,8 @@ const BookDetailModal = ({ book, onClose, onUpdate }) => {
         }
     };
 
-    const getCoverImageSrc = () => {
-        if (!book.cover_path) return null;
-
-        if (book.file_path && book.file_path.startsWith('ISBN')) {
-            return book.cover_path;
-        }
-
-        return `${API_BASE_URL}/${book.cover_path}`
-    }
-
-    const coverImageSrc = getCoverImageSrc();
+    const coverImageSrc = getCoverUrl(book, 'detail');
+    const coverImageSrcSet = getCoverSrcSet(book, 'detail');
 
     return (
         <div
@@ -88,6 +79,7 @@ const BookDetailModal = ({ book, onClose, onUpdate }) => {
                                 {coverImageSrc ? (
                                     <img
                                         src={coverImageSrc}
+                                        srcSet={coverImageSrcSet}
                                         alt={book.title}
                                         className="w-full h-full object-cover"
                                     />
@@ -2,7 +2,7 @@ import React, { useState, useRef } from 'react';
 import BookCard from './BookCard';
 import BookDetailModal from './BookDetailModal';
 import BookContextMenu from './BookContextMenu';
-import { API_BASE_URL } from '../config';
+import { getCoverUrl, getCoverSrcSet } from '../config';
 import '../App.css';
 
 const BookList = ({ books, onUpdateProgress, onUpdateRatingReview, onRemoveBook, onAddToCollection, loading }) => {
@@ -178,9 +178,10 @@ const BookList = ({ books, onUpdateProgress, onUpdateRatingReview, onRemoveBook,
                         title={`${book.title} by ${book.author}`}
                     >
                         <div className="w-full aspect-[2/3] rounded-lg overflow-hidden border-2 border-gray-200 hover:border-gray-400 hover:shadow-lg transition-all">
-                            {book.cover_path ? (
+                            {getCoverUrl(book, 'grid') ? (
                                 <img
-                                    src={`${API_BASE_URL}/${book.cover_path}`}
+                                    src={getCoverUrl(book, 'grid')}
+                                    srcSet={getCoverSrcSet(book, 'grid')}
                                     alt={book.title}
                                     className="w-full h-full object-cover"
                                 />
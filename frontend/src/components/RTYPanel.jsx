@@ -1,5 +1,5 @@
 import { useState, useEffect } from 'react';
-import { API_BASE_URL } from '../config';
+import { API_BASE_URL, getCoverUrl, getCoverSrcSet } from '../config';
 import BookDetailModal from './BookDetailModal';
 
 const RTYPanel = ({ onUpdateProgress, onUpdateRatingReview }) => {
@@ -112,9 +112,10 @@ const RTYPanel = ({ onUpdateProgress, onUpdateRatingReview }) => {
                                     onClick={() => setSelectedBook(book)}
                                 >
                                     <div className="w-16 h-24 rounded shadow-sm overflow-hidden border border-gray-200 hover:scale-105 transition-transform">
-                                        {book.cover_path ? (
+                                        {getCoverUrl(book, 'grid') ? (
                                             <img
-                                                src={`${API_BASE_URL}/${book.cover_path}`}
+                                                src={getCoverUrl(book, 'grid')}
+                                                srcSet={getCoverSrcSet(book, 'grid')}
                                                 alt={book.title}
                                                 className="w-full h-full object-cover"
                                             />
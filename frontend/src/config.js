@@ -9,4 +9,32 @@ export const getBaseUrl = () => {
     return 'http://192.168.0.118:8000';
 };
 
-export const API_BASE_URL = getBaseUrl();
\ No newline at end of file
+export const API_BASE_URL = getBaseUrl();
+
+// Stored covers are immutable files named <hash>_<size>.<ext>, so the wanted
+// size is fetched straight from /covers where browsers can cache it forever
+export const getCoverUrl = (book, size = 'grid') => {
+    if (!book.cover_path) {
+        // PDF covers are rendered after the scan, or on this first request
+        if (book.file_type === 'pdf') {
+            return `${API_BASE_URL}/books/${book.id}/cover?size=${size}`;
+        }
+        return `${API_BASE_URL}/placeholders/cover.svg?title=${encodeURIComponent(book.title)}`;
+    }
+
+    if (book.file_path && book.file_path.startsWith('ISBN')) {
+        return book.cover_path;
+    }
+
+    const sizedPath = book.cover_path.replace(/_(grid|detail|retina)\.(\w+)$/, `_${size}.$2`);
+    return `${API_BASE_URL}/${sizedPath}`;
+};
+
+// Double-density source for the given size, for use in srcSet
+export const getCoverSrcSet = (book, size = 'grid') => {
+    const hiDpi = { grid: 'detail', detail: 'retina' }[size];
+    if (!book.cover_path || !hiDpi || (book.file_path && book.file_path.startsWith('ISBN'))) {
+        return undefined;
+    }
+    return `${getCoverUrl(book, size)} 1x, ${getCoverUrl(book, hiDpi)} 2x`;
+};